@@ -0,0 +1,105 @@
+import time
+from collections import OrderedDict
+from functools import partial
+from threading import Lock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+TOKEN_KEY = 'auth-token:{}'
+GENERATION_KEY = 'auth-token-generation:{}'
+
+
+class TokenCache:
+    """Токен -> снимок пользователя: LRU в памяти процесса над кешем Django.
+
+    Запись живёт TOKEN_CACHE_TTL секунд на каждом уровне, в памяти
+    хранится не больше TOKEN_CACHE_SIZE записей. Рядом с записью в
+    памяти лежит поколение токена из общего кеша; сброс повышает
+    поколение, и при следующем обращении любой воркер видит расхождение
+    и перечитывает токен. Так попадание в память стоит одного лёгкого
+    чтения общего кеша вместо запроса к базе.
+    """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.entries = OrderedDict()
+
+    def get_or_load(self, key, load):
+        # Поколение читается до загрузки: сброс во время загрузки
+        # оставит запись с устаревшим поколением, и её перечитают.
+        generation = cache.get(GENERATION_KEY.format(key))
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                expires, entry_generation, value = entry
+                if expires > now and entry_generation == generation:
+                    self.entries.move_to_end(key)
+                    return value
+                del self.entries[key]
+        value = cache.get(TOKEN_KEY.format(key))
+        if value is None:
+            value = load()
+            cache.set(TOKEN_KEY.format(key), value, settings.TOKEN_CACHE_TTL)
+        self.remember(key, generation, value)
+        return value
+
+    def remember(self, key, generation, value):
+        expires = time.monotonic() + settings.TOKEN_CACHE_TTL
+        with self.lock:
+            self.entries[key] = (expires, generation, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > settings.TOKEN_CACHE_SIZE:
+                self.entries.popitem(last=False)
+
+    def forget(self, keys):
+        for key in keys:
+            generation_key = GENERATION_KEY.format(key)
+            try:
+                cache.incr(generation_key)
+            except ValueError:
+                cache.add(generation_key, time.time_ns(), None)
+        cache.delete_many([TOKEN_KEY.format(key) for key in keys])
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication без запроса к базе, пока токен в кеше.
+
+    В кеше лежат только значения полей пользователя без хеша пароля и
+    счётчиков. В восстановленном пользователе эти поля отложены: save()
+    их не пишет, а чтение подгружает свежие значения из базы.
+    """
+
+    uncached_fields = ('password', 'recipes_count', 'followers_count')
+
+    def authenticate_credentials(self, key):
+        fields, values, created = token_cache.get_or_load(
+            key, partial(self.snapshot, key)
+        )
+        user_model = get_user_model()
+        user = user_model.from_db(user_model.objects.db, fields, values)
+        return user, Token(key=key, user=user, created=created)
+
+    def snapshot(self, key):
+        user, token = super().authenticate_credentials(key)
+        fields = [
+            field.attname for field in user._meta.concrete_fields
+            if field.attname not in self.uncached_fields
+        ]
+        return (
+            fields, [getattr(user, name) for name in fields], token.created
+        )
@@ -0,0 +1,305 @@
+import json
+import random
+import resource
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from recipes.models import Ingredient, Recipe, Tag
+from rest_framework.authtoken.models import Token
+from users.models import User
+
+BENCHMARK_USERNAME = 'benchmark'
+
+IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAA'
+    'DUlEQVR42mP8z8BQDwAEhQGAhKmMIQAAAABJRU5ErkJggg=='
+)
+
+
+@dataclass
+class Endpoint:
+    name: str
+    method: str
+    path: str
+    authenticated: bool = True
+    payload: Optional[Callable] = None
+    cleanup: Optional['Endpoint'] = None
+    expected: tuple = (200,)
+
+
+def recipe_payload(context):
+    ingredients = context.rnd.sample(
+        context.ingredients, min(8, len(context.ingredients))
+    )
+    return {
+        'name': 'Рецепт для нагрузочного теста',
+        'text': 'Описание',
+        'cooking_time': context.rnd.randint(1, 120),
+        'image': IMAGE,
+        'tags': context.tags[:2],
+        'ingredients': [
+            {'id': ingredient, 'amount': context.rnd.randint(1, 500)}
+            for ingredient in ingredients
+        ],
+    }
+
+
+ENDPOINTS = {endpoint.name: endpoint for endpoint in (
+    Endpoint('recipe-list', 'get', '/api/recipes/?limit={page_size}',
+             authenticated=False),
+    Endpoint('recipe-list-auth', 'get', '/api/recipes/?limit={page_size}'),
+    Endpoint('recipe-list-filtered', 'get',
+             '/api/recipes/?limit={page_size}&tags={tag_slug}'
+             '&is_favorited=1'),
+    Endpoint('recipe-detail', 'get', '/api/recipes/{recipe}/'),
+    Endpoint('recipe-create', 'post', '/api/recipes/',
+             payload=recipe_payload, expected=(201,),
+             cleanup=Endpoint('recipe-delete', 'delete',
+                              '/api/recipes/{created}/', expected=(204,))),
+    Endpoint('recipe-update', 'patch', '/api/recipes/{own_recipe}/',
+             payload=recipe_payload),
+    Endpoint('favorite', 'post', '/api/recipes/{recipe}/favorite/',
+             expected=(201, 400),
+             cleanup=Endpoint('favorite-delete', 'delete',
+                              '/api/recipes/{recipe}/favorite/',
+                              expected=(204,))),
+    Endpoint('shopping-cart', 'post', '/api/recipes/{recipe}/shopping_cart/',
+             expected=(201, 400),
+             cleanup=Endpoint('shopping-cart-delete', 'delete',
+                              '/api/recipes/{recipe}/shopping_cart/',
+                              expected=(204,))),
+    Endpoint('download-shopping-cart', 'get',
+             '/api/recipes/download_shopping_cart/'),
+    Endpoint('download-shopping-cart-txt', 'get',
+             '/api/recipes/download_shopping_cart/?format=txt'),
+    Endpoint('user-list', 'get', '/api/users/?limit={page_size}'),
+    Endpoint('user-detail', 'get', '/api/users/{author}/'),
+    Endpoint('user-me', 'get', '/api/users/me/'),
+    Endpoint('subscriptions', 'get',
+             '/api/users/subscriptions/?limit={page_size}&recipes_limit=3'),
+    Endpoint('subscribe', 'post', '/api/users/{author}/subscribe/',
+             expected=(201, 400),
+             cleanup=Endpoint('subscribe-delete', 'delete',
+                              '/api/users/{author}/subscribe/',
+                              expected=(204,))),
+    Endpoint('tag-list', 'get', '/api/tags/', authenticated=False),
+    Endpoint('ingredient-list', 'get', '/api/ingredients/',
+             authenticated=False),
+    Endpoint('ingredient-search', 'get', '/api/ingredients/?name={prefix}',
+             authenticated=False),
+)}
+
+READ_MIX = {
+    'recipe-list': 20,
+    'recipe-list-auth': 15,
+    'recipe-list-filtered': 5,
+    'recipe-detail': 20,
+    'subscriptions': 5,
+    'user-list': 3,
+    'user-detail': 5,
+    'user-me': 5,
+    'tag-list': 5,
+    'ingredient-list': 2,
+    'ingredient-search': 12,
+    'download-shopping-cart': 3,
+}
+
+WRITE_MIX = {
+    'favorite': 30,
+    'shopping-cart': 30,
+    'subscribe': 20,
+    'recipe-create': 10,
+    'recipe-update': 10,
+}
+
+SCENARIOS = {
+    'read': READ_MIX,
+    'write': WRITE_MIX,
+    'mixed': {
+        **{name: weight * 4 for name, weight in READ_MIX.items()},
+        **WRITE_MIX,
+    },
+}
+
+
+def percentile(values, percent):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, -(-len(ordered) * percent // 100) - 1)
+    return ordered[int(index)]
+
+
+def peak_rss_kb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def rss_kb():
+    """Текущий RSS процесса; без /proc — пиковый, как лучшее приближение."""
+    try:
+        with open('/proc/self/statm') as statm:
+            pages = int(statm.read().split()[1])
+    except OSError:
+        return peak_rss_kb()
+    return pages * resource.getpagesize() // 1024
+
+
+@dataclass
+class Stats:
+    latencies: list = field(default_factory=list)
+    queries: int = 0
+    errors: int = 0
+    rss_growth_kb: int = 0
+
+    def as_dict(self, elapsed):
+        """elapsed — время всего прогона в секундах по настенным часам."""
+        count = len(self.latencies)
+        total = sum(self.latencies)
+        return {
+            'requests': count,
+            'errors': self.errors,
+            'p50_ms': percentile(self.latencies, 50),
+            'p95_ms': percentile(self.latencies, 95),
+            'p99_ms': percentile(self.latencies, 99),
+            'mean_ms': total / count if count else None,
+            'throughput_rps': count / elapsed if elapsed else None,
+            'queries_per_request': self.queries / count if count else None,
+            'rss_growth_kb': self.rss_growth_kb,
+        }
+
+
+class BenchmarkContext:
+    def __init__(self, rnd, page_size):
+        self.rnd = rnd
+        self.page_size = page_size
+        self.user, _ = User.objects.get_or_create(
+            username=BENCHMARK_USERNAME,
+            defaults={'email': 'benchmark@example.com'}
+        )
+        self.token, _ = Token.objects.get_or_create(user=self.user)
+        self.recipes = list(
+            Recipe.objects.values_list('id', flat=True)[:1000]
+        )
+        self.authors = list(
+            User.objects.exclude(pk=self.user.pk)
+            .filter(recipes__isnull=False).distinct()
+            .values_list('id', flat=True)[:1000]
+        )
+        self.ingredients = list(
+            Ingredient.objects.values_list('id', flat=True)[:1000]
+        )
+        ingredient_names = Ingredient.objects.values_list(
+            'name', flat=True
+        )[:200]
+        self.prefixes = sorted({name[:2] for name in ingredient_names})
+        self.tags = list(Tag.objects.values_list('id', flat=True))
+        self.tag_slugs = list(Tag.objects.values_list('slug', flat=True))
+        if not (self.recipes and self.authors and self.ingredients
+                and self.tags):
+            raise ValueError(
+                'Для нагрузочного теста нужны рецепты, авторы, ингредиенты '
+                'и теги: запустите generate_dataset.'
+            )
+        self.own_recipe = None
+        self.created = None
+
+    def values(self):
+        return {
+            'page_size': self.page_size,
+            'recipe': self.rnd.choice(self.recipes),
+            'author': self.rnd.choice(self.authors),
+            'prefix': self.rnd.choice(self.prefixes),
+            'tag_slug': self.rnd.choice(self.tag_slugs),
+            'own_recipe': self.own_recipe,
+            'created': self.created,
+        }
+
+
+class Benchmark:
+    def __init__(self, mix, requests, warmup=0, page_size=10, seed=0):
+        self.mix = mix
+        self.requests = requests
+        self.warmup = warmup
+        self.rnd = random.Random(seed)
+        self.context = BenchmarkContext(self.rnd, page_size)
+        self.anonymous = Client(HTTP_HOST='localhost')
+        self.authenticated = Client(
+            HTTP_HOST='localhost',
+            HTTP_AUTHORIZATION=f'Token {self.context.token.key}'
+        )
+        self.stats = {}
+
+    def execute(self, endpoint, values):
+        client = self.authenticated if endpoint.authenticated else (
+            self.anonymous
+        )
+        path = endpoint.path.format(**values)
+        data = endpoint.payload(self.context) if endpoint.payload else None
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = getattr(client, endpoint.method)(
+                path, json.dumps(data) if data is not None else None,
+                content_type='application/json'
+            )
+            if response.streaming:
+                for _ in response.streaming_content:
+                    pass
+            elapsed = (time.perf_counter() - started) * 1000
+        return response, queries.captured_queries, elapsed
+
+    def call(self, endpoint, values, record=True):
+        rss_before = rss_kb()
+        response, queries, elapsed = self.execute(endpoint, values)
+        if record:
+            stats = self.stats.setdefault(endpoint.name, Stats())
+            stats.latencies.append(elapsed)
+            stats.queries += len(queries)
+            stats.errors += response.status_code not in endpoint.expected
+            stats.rss_growth_kb += rss_kb() - rss_before
+        return response
+
+    def run_one(self, name, record=True):
+        endpoint = ENDPOINTS[name]
+        values = self.context.values()
+        response = self.call(endpoint, values, record)
+        if endpoint.cleanup:
+            if response.status_code == 201 and 'id' in response.json():
+                values['created'] = response.json()['id']
+            self.call(endpoint.cleanup, values, record)
+
+    def run(self):
+        response = self.call(
+            ENDPOINTS['recipe-create'], self.context.values(), record=False
+        )
+        self.context.own_recipe = response.json()['id']
+        names = list(self.mix)
+        weights = [self.mix[name] for name in names]
+        try:
+            for _ in range(self.warmup):
+                self.run_one(self.rnd.choices(names, weights)[0], False)
+            started = time.perf_counter()
+            for _ in range(self.requests):
+                self.run_one(self.rnd.choices(names, weights)[0])
+            elapsed = time.perf_counter() - started
+        finally:
+            Recipe.objects.filter(pk=self.context.own_recipe).delete()
+        total = sum(len(stats.latencies) for stats in self.stats.values())
+        return {
+            'meta': {
+                'database': connection.vendor,
+                'requests': self.requests,
+                'warmup': self.warmup,
+                'page_size': self.context.page_size,
+                'elapsed_s': elapsed,
+                'throughput_rps': total / elapsed if elapsed else None,
+                'peak_rss_kb': peak_rss_kb(),
+            },
+            'endpoints': {
+                name: stats.as_dict(elapsed)
+                for name, stats in sorted(self.stats.items())
+            },
+        }
@@ -0,0 +1,33 @@
+import hashlib
+
+from django.core.cache import cache
+from recipes.catalog import get_version
+from rest_framework.renderers import JSONRenderer
+
+RESPONSE_KEY = 'catalog-response:{}:{}'
+
+
+class CatalogResponseCache:
+    """Готовый JSON полного списка справочника.
+
+    Тело хранится в памяти процесса и в общем кеше Django под ключом
+    с версией справочника; сигналы моделей повышают версию, и старые
+    записи перестают читаться.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.local = None
+
+    def get(self, render):
+        version = get_version(self.name)
+        if self.local and self.local[0] == version:
+            return self.local[1]
+        key = RESPONSE_KEY.format(self.name, version)
+        entry = cache.get(key)
+        if entry is None:
+            body = JSONRenderer().render(render())
+            entry = (f'"{hashlib.sha1(body).hexdigest()}"', body)
+            cache.set(key, entry, None)
+        self.local = (version, entry)
+        return entry
@@ -0,0 +1,119 @@
+import re
+
+SQLITE_SCAN = re.compile(r'^SCAN (?:TABLE )?(?P<table>\S+)')
+ALIAS = re.compile(r'"(?P<table>\w+)" (?P<alias>[A-Z]\d+)\b')
+TOP_LIMIT = re.compile(r'\bLIMIT \d+\s*$')
+
+
+class PlanAuditor:
+    """Разбирает планы запросов и ищет дорогие места.
+
+    PostgreSQL: Seq Scan по таблицам не меньше min_rows строк и
+    Nested Loop, у которого внешняя часть отдаёт не меньше min_rows
+    строк. SQLite: полные проходы по таблицам не меньше min_rows строк,
+    кроме внешнего цикла запроса с LIMIT без сортировки, и сортировки
+    во временном B-дереве.
+    """
+
+    def __init__(self, connection, min_rows, analyze=False):
+        self.connection = connection
+        self.min_rows = min_rows
+        self.analyze = analyze and connection.vendor == 'postgresql'
+        self.sizes = {}
+        self.tables = set(connection.introspection.table_names())
+
+    def audit(self, sql):
+        if not sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+            return []
+        if self.connection.vendor == 'postgresql':
+            return self.audit_postgresql(sql)
+        if self.connection.vendor == 'sqlite':
+            return self.audit_sqlite(sql)
+        return []
+
+    def table_rows(self, table):
+        if table not in self.tables:
+            return 0
+        if table not in self.sizes:
+            with self.connection.cursor() as cursor:
+                rows = 0
+                if self.connection.vendor == 'postgresql':
+                    cursor.execute(
+                        'SELECT reltuples FROM pg_class WHERE relname = %s',
+                        (table,)
+                    )
+                    row = cursor.fetchone()
+                    rows = int(row[0]) if row else 0
+                if rows <= 0:
+                    # Без ANALYZE (новая база, свежая загрузка) reltuples
+                    # равен -1 или 0 — тогда считаем честно.
+                    cursor.execute(
+                        'SELECT COUNT(*) FROM '
+                        + self.connection.ops.quote_name(table)
+                    )
+                    rows = cursor.fetchone()[0]
+                self.sizes[table] = rows
+        return self.sizes[table]
+
+    def audit_postgresql(self, sql):
+        options = 'ANALYZE, FORMAT JSON' if self.analyze else 'FORMAT JSON'
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN ({options}) {sql}')
+            plan = cursor.fetchone()[0][0]['Plan']
+        issues = []
+        for node in walk(plan):
+            if node['Node Type'] == 'Seq Scan':
+                rows = self.table_rows(node['Relation Name'])
+                if rows >= self.min_rows:
+                    issues.append(
+                        f'Seq Scan по {node["Relation Name"]} '
+                        f'(~{rows} строк в таблице)'
+                    )
+            elif node['Node Type'] == 'Nested Loop':
+                outer = node['Plans'][0]
+                rows = outer.get('Actual Rows', outer['Plan Rows']) * (
+                    outer.get('Actual Loops', 1)
+                )
+                if rows >= self.min_rows:
+                    issues.append(
+                        f'Nested Loop: ~{rows} проходов внутренней части'
+                    )
+        return issues
+
+    def audit_sqlite(self, sql):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            plan = cursor.fetchall()
+        aliases = {}
+        for match in ALIAS.finditer(sql):
+            aliases.setdefault(match['alias'], set()).add(match['table'])
+        sorts = [detail for *_, detail in plan if 'TEMP B-TREE' in detail]
+        stops_early = bool(TOP_LIMIT.search(sql)) and not any(
+            'ORDER BY' in detail for detail in sorts
+        )
+        issues = list(sorts)
+        loops = {}
+        for _, parent, _, detail in plan:
+            if not detail.startswith(('SCAN', 'SEARCH')):
+                continue
+            loops[parent] = loops.get(parent, 0) + 1
+            match = SQLITE_SCAN.match(detail)
+            if match is None:
+                continue
+            inner = loops[parent] > 1 or parent != 0
+            if stops_early and not inner:
+                continue
+            tables = aliases.get(match['table'], {match['table']})
+            rows = max(self.table_rows(table) for table in tables)
+            if rows >= self.min_rows:
+                issues.append(
+                    f'{detail} (~{rows} строк в таблице'
+                    + (', во внутреннем цикле)' if inner else ')')
+                )
+        return issues
+
+
+def walk(plan):
+    yield plan
+    for child in plan.get('Plans', ()):
+        yield from walk(child)
@@ -1,15 +1,165 @@
 import base64
+import binascii
+from tempfile import SpooledTemporaryFile
 
-from django.core.files.base import ContentFile
+from django.conf import settings
+from django.core.files import File
+from PIL import Image
+from recipes.images import rendition_url
 from rest_framework import serializers
 
+CHUNK_SIZE = 64 * 1024
+SPOOL_SIZE = 1024 * 1024
+MIME_ALIASES = {'image/jpg': 'image/jpeg'}
+WHITESPACE = ' \t\n\r\v\f'
+STRIP_WHITESPACE = str.maketrans('', '', WHITESPACE)
+
 
 class Base64ImageField(serializers.ImageField):
+    """Картинка в виде data URL.
+
+    base64 декодируется кусками во временный файл, который уходит на
+    диск после SPOOL_SIZE; размер результата известен по длине строки,
+    поэтому слишком большие картинки отклоняются до декодирования.
+    Пробелы и переводы строк внутри base64 пропускаются, остальные
+    символы вне алфавита — ошибка. Тип из data URL сверяется с
+    реальным форматом файла.
+    """
+
+    default_error_messages = {
+        **serializers.ImageField.default_error_messages,
+        'too_large': 'Размер изображения не должен превышать {max_size} байт.',
+        'mime_mismatch': 'Заявлен тип {declared}, а загружен {actual}.',
+    }
+
+    def to_internal_value(self, data):
+        if not (isinstance(data, str) and data.startswith('data:image')):
+            return super().to_internal_value(data)
+        separator = data.find(';base64,')
+        if separator == -1:
+            self.fail('invalid_image')
+        declared = data[len('data:'):separator].lower()
+        file = self.decode(data, separator + len(';base64,'))
+        try:
+            image = Image.open(file)
+            image.verify()
+        except Exception:
+            file.close()
+            self.fail('invalid_image')
+        actual = Image.MIME.get(image.format)
+        if MIME_ALIASES.get(declared, declared) != actual:
+            file.close()
+            self.fail('mime_mismatch', declared=declared, actual=actual)
+        upload = File(file, name=f'temp.{image.format.lower()}')
+        upload.size = file.seek(0, 2)
+        file.seek(0)
+        upload.image = image
+        upload.content_type = actual
+        return serializers.FileField.to_internal_value(self, upload)
+
+    def decode(self, data, offset):
+        max_size = settings.IMAGE_UPLOAD_MAX_SIZE
+        length = len(data) - offset - sum(
+            data.count(char, offset) for char in WHITESPACE
+        )
+        size = length * 3 // 4 - data.rstrip()[-2:].count('=')
+        if size > max_size:
+            self.fail('too_large', max_size=max_size)
+        file = SpooledTemporaryFile(max_size=SPOOL_SIZE)
+        rest = ''
+        try:
+            for start in range(offset, len(data), CHUNK_SIZE):
+                # Декодируем только целые четвёрки символов, хвост
+                # переносим в следующий кусок.
+                rest += data[start:start + CHUNK_SIZE].translate(
+                    STRIP_WHITESPACE
+                )
+                whole = len(rest) - len(rest) % 4
+                file.write(base64.b64decode(rest[:whole], validate=True))
+                rest = rest[whole:]
+            if rest:
+                raise binascii.Error('Incorrect padding')
+        except binascii.Error:
+            file.close()
+            self.fail('invalid_image')
+        file.seek(0)
+        return file
+
+
+class RenditionImageField(serializers.ImageField):
+    """Ссылка на уменьшенную копию картинки рецепта.
+
+    В списке рецептов отдаётся list_rendition, в остальных случаях —
+    rendition.
+    """
+
+    def __init__(self, rendition, list_rendition=None, **kwargs):
+        kwargs['read_only'] = True
+        self.rendition = rendition
+        self.list_rendition = list_rendition or rendition
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        view = self.context.get('view')
+        rendition = (
+            self.list_rendition if getattr(view, 'action', None) == 'list'
+            else self.rendition
+        )
+        url = rendition_url(value, rendition)
+        request = self.context.get('request')
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
+
+def in_bulk_or_fail(queryset, pks):
+    """Объекты по id одним запросом IN; все ненайденные id — в одной ошибке."""
+    found = queryset.in_bulk(set(pks))
+    missing = sorted(set(pks) - found.keys())
+    if missing:
+        raise serializers.ValidationError(
+            'Нет объектов с id: {}.'.format(', '.join(map(str, missing))),
+            code='does_not_exist'
+        )
+    return found
+
+
+class PrimaryKeyListField(serializers.ListField):
+    """Список id, которые превращаются в объекты одним запросом."""
+
+    child = serializers.IntegerField(min_value=1)
+
+    def __init__(self, queryset, **kwargs):
+        self.queryset = queryset
+        super().__init__(**kwargs)
+
     def to_internal_value(self, data):
-        if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
-            ext = format.split('/')[-1]
+        pks = super().to_internal_value(data)
+        found = in_bulk_or_fail(self.queryset.all(), pks)
+        return [found[pk] for pk in pks]
+
+    def to_representation(self, value):
+        if hasattr(value, 'all'):
+            value = value.all()
+        return [item.pk for item in value]
+
 
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
+class ResolvingListSerializer(serializers.ListSerializer):
+    """Список вложенных объектов с внешними ключами в виде id.
 
-        return super().to_internal_value(data)
+    Дочерний сериализатор принимает ключ в поле с source='<name>_id' и
+    перечисляет их в Meta.resolve_fields = {'<name>': queryset}; здесь
+    id всех элементов ищутся одним запросом на поле и заменяются
+    объектами под ключом <name>.
+    """
+
+    def to_internal_value(self, data):
+        items = super().to_internal_value(data)
+        for name, queryset in self.child.Meta.resolve_fields.items():
+            pks = [item.pop(f'{name}_id') for item in items]
+            found = in_bulk_or_fail(queryset.all(), pks)
+            for item, pk in zip(items, pks):
+                item[name] = found[pk]
+        return items
@@ -1,21 +1,57 @@
+from django import forms
+from django.conf import settings
+from django.db.models import BooleanField, Case, Exists, OuterRef, Value, When
 from django_filters.rest_framework import FilterSet, filters
-from recipes.models import Ingredient, Recipe, Tag
+from recipes.models import Ingredient, Recipe
+from recipes.search import tag_slugs
 
 
 class IngredientFilter(FilterSet):
-    name = filters.CharFilter(lookup_expr='icontains')
+    name = filters.CharFilter(method='filter_name')
 
     class Meta:
         model = Ingredient
         fields = ['name']
 
+    def filter_name(self, queryset, name, value):
+        return queryset.filter(name__icontains=value).annotate(
+            is_prefix=Case(
+                When(name__istartswith=value, then=Value(True)),
+                default=Value(False),
+                output_field=BooleanField()
+            )
+        ).order_by('-is_prefix', 'name')[:settings.INGREDIENT_SEARCH_LIMIT]
+
+
+class TagSlugField(forms.MultipleChoiceField):
+    def valid_value(self, value):
+        return value in tag_slugs.get()
+
+
+class TagSlugFilter(filters.MultipleChoiceFilter):
+    """Рецепты хотя бы с одним из тегов, одним EXISTS без JOIN и DISTINCT.
+
+    Слаги переводятся в id по кешу процесса, без запроса к тегам.
+    """
+
+    field_class = TagSlugField
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('distinct', False)
+        super().__init__(*args, **kwargs)
+
+    def filter(self, qs, value):
+        if not value:
+            return qs
+        ids = tag_slugs.get()
+        return qs.filter(Exists(Recipe.tags.through.objects.filter(
+            recipe_id=OuterRef('pk'),
+            tag_id__in=[ids[slug] for slug in value if slug in ids]
+        )))
+
 
 class RecipeFilter(FilterSet):
-    tags = filters.ModelMultipleChoiceFilter(
-        field_name='tags__slug',
-        to_field_name='slug',
-        queryset=Tag.objects.all()
-    )
+    tags = TagSlugFilter()
     is_favorited = filters.BooleanFilter(
         method='filters_is_favorited'
     )
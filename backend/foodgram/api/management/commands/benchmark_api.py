@@ -0,0 +1,97 @@
+import json
+
+from api.benchmark import ENDPOINTS, SCENARIOS, Benchmark
+from django.core.management.base import BaseCommand, CommandError
+
+COLUMNS = (
+    ('requests', 'запр.', '{:>6}'),
+    ('p50_ms', 'p50 мс', '{:>8.2f}'),
+    ('p95_ms', 'p95 мс', '{:>8.2f}'),
+    ('p99_ms', 'p99 мс', '{:>8.2f}'),
+    ('throughput_rps', 'rps', '{:>8.1f}'),
+    ('queries_per_request', 'SQL', '{:>6.1f}'),
+    ('rss_growth_kb', 'ΔRSS КБ', '{:>9}'),
+    ('errors', 'ошибки', '{:>8}'),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест API внутри процесса: прогоняет смесь запросов '
+        'через весь стек Django/DRF и сохраняет перцентили задержек, '
+        'пропускную способность, число SQL-запросов и прирост RSS.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scenario', default='mixed', choices=sorted(SCENARIOS),
+        )
+        parser.add_argument(
+            '--mix',
+            help='JSON со своей смесью, например {"recipe-list": 3, '
+                 '"favorite": 1}. Заменяет --scenario.'
+        )
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--warmup', type=int, default=50)
+        parser.add_argument('--page-size', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Куда записать результат JSON.')
+        parser.add_argument(
+            '--compare', help='JSON предыдущего прогона для сравнения p95.'
+        )
+
+    def handle(self, *args, **options):
+        mix = SCENARIOS[options['scenario']]
+        if options['mix']:
+            try:
+                mix = json.loads(options['mix'])
+            except ValueError as error:
+                raise CommandError(f'Некорректный --mix: {error}')
+        unknown = set(mix) - set(ENDPOINTS)
+        if unknown:
+            raise CommandError(
+                f'Неизвестные эндпоинты: {", ".join(sorted(unknown))}'
+            )
+        try:
+            benchmark = Benchmark(
+                mix, options['requests'], options['warmup'],
+                options['page_size'], options['seed']
+            )
+        except ValueError as error:
+            raise CommandError(error)
+        result = benchmark.run()
+        result['meta']['scenario'] = (
+            'custom' if options['mix'] else options['scenario']
+        )
+        result['meta']['mix'] = mix
+
+        previous = {}
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as file:
+                previous = json.load(file)['endpoints']
+        self.print_table(result, previous)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(result, file, ensure_ascii=False, indent=2)
+            self.stdout.write(f'Результат записан в {options["output"]}')
+
+    def print_table(self, result, previous):
+        header = f'{"эндпоинт":<24}' + ''.join(
+            f'{title:>{len(fmt.format(0))}}' for _, title, fmt in COLUMNS
+        )
+        if previous:
+            header += f'{"Δp95":>9}'
+        self.stdout.write(header)
+        for name, stats in result['endpoints'].items():
+            line = f'{name:<24}' + ''.join(
+                fmt.format(stats[key]) for key, _, fmt in COLUMNS
+            )
+            if name in previous and previous[name]['p95_ms']:
+                change = stats['p95_ms'] / previous[name]['p95_ms'] - 1
+                line += f'{change:>+9.0%}'
+            self.stdout.write(line)
+        meta = result['meta']
+        self.stdout.write(
+            f'Всего: {meta["throughput_rps"]:.1f} запр./с, '
+            f'пиковый RSS {meta["peak_rss_kb"]} КБ, БД {meta["database"]}'
+        )
@@ -0,0 +1,87 @@
+from api.benchmark import ENDPOINTS, Benchmark
+from api.explain import PlanAuditor
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+SQL_PREVIEW = 160
+
+
+class Command(BaseCommand):
+    help = (
+        'Вызывает эндпоинты API, прогоняет каждый их SQL-запрос через '
+        'EXPLAIN и показывает полные просмотры больших таблиц, вложенные '
+        'циклы по большим выборкам и сортировки без индекса. Все '
+        'изменения в базе откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'endpoints', nargs='*',
+            help='Имена эндпоинтов из api.benchmark; по умолчанию все GET.'
+        )
+        parser.add_argument('--min-rows', type=int, default=1000)
+        parser.add_argument('--page-size', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--analyze', action='store_true',
+            help='EXPLAIN ANALYZE на PostgreSQL: реальные числа строк.'
+        )
+        parser.add_argument(
+            '--fail', action='store_true',
+            help='Завершиться с ошибкой, если найдены замечания.'
+        )
+
+    def handle(self, *args, **options):
+        names = options['endpoints'] or [
+            name for name, endpoint in ENDPOINTS.items()
+            if endpoint.method == 'get'
+        ]
+        unknown = set(names) - set(ENDPOINTS)
+        if unknown:
+            raise CommandError(
+                f'Неизвестные эндпоинты: {", ".join(sorted(unknown))}'
+            )
+        try:
+            benchmark = Benchmark(
+                {}, 0, page_size=options['page_size'], seed=options['seed']
+            )
+        except ValueError as error:
+            raise CommandError(error)
+        auditor = PlanAuditor(
+            connection, options['min_rows'], options['analyze']
+        )
+        total = 0
+        for name in names:
+            total += self.audit(benchmark, auditor, ENDPOINTS[name])
+        self.stdout.write(f'Всего замечаний: {total}, БД {connection.vendor}')
+        if total and options['fail']:
+            raise CommandError('Найдены запросы без подходящих индексов.')
+
+    def audit(self, benchmark, auditor, endpoint):
+        with transaction.atomic():
+            if '{own_recipe}' in endpoint.path:
+                response = benchmark.call(
+                    ENDPOINTS['recipe-create'], benchmark.context.values(),
+                    record=False
+                )
+                benchmark.context.own_recipe = response.json()['id']
+            response, queries, _ = benchmark.execute(
+                endpoint, benchmark.context.values()
+            )
+            found = [
+                (query['sql'], issue)
+                for query in queries
+                for issue in auditor.audit(query['sql'])
+            ]
+            transaction.set_rollback(True)
+        style = self.style.WARNING if found else self.style.SUCCESS
+        self.stdout.write(style(
+            f'{endpoint.name}: {response.status_code}, '
+            f'{len(queries)} SQL, замечаний {len(found)}'
+        ))
+        for sql, issue in found:
+            preview = sql if len(sql) <= SQL_PREVIEW else (
+                sql[:SQL_PREVIEW] + '…'
+            )
+            self.stdout.write(f'  {issue}\n    {preview}')
+        return len(found)
@@ -1,64 +1,245 @@
+from api.serializers import RelationIdsSerializer
+from django.db import connection, transaction
+from django.http import Http404, HttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.http import parse_etags
+from recipes.counters import bump
 from recipes.models import Recipe
 from rest_framework import status
 from rest_framework.response import Response
 from users.models import User
 
 
+def relation_columns(model, field):
+    ops = connection.ops
+    return (
+        ops.quote_name(model._meta.db_table),
+        ops.quote_name(model._meta.get_field('user').column),
+        ops.quote_name(model._meta.get_field(field).column),
+    )
+
+
+def insert_sql(model, field, target_model, count):
+    """INSERT ... SELECT связей с существующими целями без ошибки на дубликат.
+
+    Параметры: id пользователя, затем count id целей.
+    """
+    ops = connection.ops
+    table, user_column, target_column = relation_columns(model, field)
+    target_table = ops.quote_name(target_model._meta.db_table)
+    target_pk = ops.quote_name(target_model._meta.pk.column)
+    placeholders = ', '.join(['%s'] * count)
+    return (
+        f'{ops.insert_statement(ignore_conflicts=True)} {table} '
+        f'({user_column}, {target_column}) '
+        f'SELECT %s, {target_pk} FROM {target_table} '
+        f'WHERE {target_pk} IN ({placeholders}) '
+        f'{ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)}'
+    )
+
+
+def delete_sql(model, field, count):
+    table, user_column, target_column = relation_columns(model, field)
+    placeholders = ', '.join(['%s'] * count)
+    return (
+        f'DELETE FROM {table} WHERE {user_column} = %s '
+        f'AND {target_column} IN ({placeholders})'
+    )
+
+
+def insert_relation(model, field, user_id, target_model, target_id):
+    """Добавляет связь одним INSERT ... SELECT без ошибки на дубликат.
+
+    Возвращает число вставленных строк: 0, если цели нет или связь
+    уже есть.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            insert_sql(model, field, target_model, 1), (user_id, target_id)
+        )
+        return cursor.rowcount
+
+
+def delete_relation(model, field, user_id, target_ids):
+    """Удаляет связи пользователя с целями одним DELETE без сигналов."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            delete_sql(model, field, len(target_ids)), (user_id, *target_ids)
+        )
+        return cursor.rowcount
+
+
+def linked_targets(model, field, user_id, target_ids):
+    return set(model.objects.filter(
+        user_id=user_id, **{f'{field}_id__in': target_ids}
+    ).values_list(f'{field}_id', flat=True))
+
+
+def changed_targets(model, field, user_id, target_ids, sql):
+    """Выполняет INSERT или DELETE связей и отдаёт id затронутых целей.
+
+    PostgreSQL возвращает их через RETURNING. Django 3.2 не умеет
+    RETURNING на SQLite, поэтому там сравниваем связи до и после
+    запроса в той же транзакции.
+    """
+    if not target_ids:
+        return set()
+    target_ids = list(target_ids)
+    returning = connection.features.can_return_columns_from_insert
+    if returning:
+        sql = f'{sql} RETURNING {relation_columns(model, field)[2]}'
+    else:
+        before = linked_targets(model, field, user_id, target_ids)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, (user_id, *target_ids))
+        if returning:
+            return {target_id for target_id, in cursor.fetchall()}
+    return before ^ linked_targets(model, field, user_id, target_ids)
+
+
+def insert_relations(model, field, user_id, target_model, target_ids):
+    """Добавляет связи с целями; отдаёт id действительно вставленных."""
+    return changed_targets(
+        model, field, user_id, target_ids,
+        insert_sql(model, field, target_model, len(target_ids))
+    )
+
+
+def delete_relations(model, field, user_id, target_ids):
+    """Удаляет связи с целями; отдаёт id действительно удалённых."""
+    return changed_targets(
+        model, field, user_id, target_ids,
+        delete_sql(model, field, len(target_ids))
+    )
+
+
 class ActionBasedRelationshipMixin:
+    """Добавление и удаление связи одним SQL-запросом.
+
+    Статус ответа берётся из числа затронутых строк, существование цели
+    проверяется только тогда, когда ничего не изменилось. Сигналы при
+    этом не срабатывают, поэтому счётчики сдвигаются здесь же.
+    """
+
+    # action: модель цели, поле связи, счётчик на цели.
+    actions_mapping = {
+        'favorite': (Recipe, 'recipe', 'favorites_count'),
+        'shopping_cart': (Recipe, 'recipe', None),
+        'subscribe': (User, 'author', 'followers_count'),
+    }
+
     def perform_action(self, user, model, serializer, response_text, **kwargs):
         action = self.action
         id_key = 'id' if action == 'subscribe' else 'pk'
 
-        actions_mapping = {
-            'favorite': (Recipe, 'recipe'),
-            'shopping_cart': (Recipe, 'recipe'),
-            'subscribe': (User, 'author'),
-        }
-
-        if action not in actions_mapping:
+        if action not in self.actions_mapping:
             return Response(status=status.HTTP_400_BAD_REQUEST)
 
-        model_class, relation_name = actions_mapping[action]
-        target_obj = get_object_or_404(model_class, id=self.kwargs[id_key])
+        model_class, relation_name, counter = self.actions_mapping[action]
+        try:
+            target_id = int(self.kwargs[id_key])
+        except ValueError:
+            raise Http404
 
         if self.request.method == 'POST':
-            create_args = {'user': user, relation_name: target_obj}
-            existing_instance = model.objects.filter(**create_args).exists()
-
-            if action == 'subscribe':
-                serializer_instance = serializer(
-                    target_obj,
-                    data=self.request.data,
-                    context={'request': self.request}
-                )
-                serializer_instance.is_valid(raise_exception=True)
-            else:
-                serializer_instance = serializer(
-                    target_obj, context={'request': self.request}
-                )
-
-            if not existing_instance:
-                model.objects.create(**create_args)
+            if action == 'subscribe' and target_id == user.pk:
                 return Response(
-                    serializer_instance.data,
-                    status=status.HTTP_201_CREATED
+                    'Нельзя подписываться на самого себя!',
+                    status=status.HTTP_400_BAD_REQUEST
                 )
-            else:
+            with transaction.atomic(savepoint=False):
+                created = insert_relation(
+                    model, relation_name, user.pk, model_class, target_id
+                )
+                if counter:
+                    bump(model_class, counter, [target_id], created)
+            if not created:
+                get_object_or_404(model_class, id=target_id)
                 return Response(
                     response_text,
                     status=status.HTTP_400_BAD_REQUEST
                 )
+            target_obj = get_object_or_404(model_class, id=target_id)
+            return Response(
+                serializer(target_obj, context={'request': self.request}).data,
+                status=status.HTTP_201_CREATED
+            )
 
         elif self.request.method == 'DELETE':
-            obj = model.objects.filter(
-                user=user,
-                **{relation_name: target_obj}
-            )
-            obj.delete()
+            with transaction.atomic(savepoint=False):
+                deleted = delete_relation(
+                    model, relation_name, user.pk, [target_id]
+                )
+                if counter:
+                    bump(model_class, counter, [target_id], -deleted)
+            if not deleted:
+                get_object_or_404(model_class, id=target_id)
+                return Response(
+                    'Нечего удалять!',
+                    status=status.HTTP_400_BAD_REQUEST
+                )
             return Response(
                 'Успешно выполнено!',
                 status=status.HTTP_204_NO_CONTENT
             )
 
         return Response(status=status.HTTP_400_BAD_REQUEST)
+
+    def perform_bulk_action(self, user, model, action):
+        """Та же связь для списка id: чтение, одна запись, один счётчик.
+
+        Для каждого id в ответе статус: created, exists, deleted,
+        missing, not_found или self. created, deleted и сдвиг счётчика
+        берутся из строк, которые запись действительно затронула.
+        """
+        serializer = RelationIdsSerializer(data=self.request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = list(dict.fromkeys(serializer.validated_data['ids']))
+        model_class, relation_name, counter = self.actions_mapping[action]
+        results = dict.fromkeys(ids, 'not_found')
+        if action == 'subscribe' and user.pk in results:
+            results[user.pk] = 'self'
+            ids.remove(user.pk)
+
+        with transaction.atomic(savepoint=False):
+            found = set(model_class.objects.filter(
+                pk__in=ids
+            ).values_list('pk', flat=True))
+            if self.request.method == 'POST':
+                changed = insert_relations(
+                    model, relation_name, user.pk, model_class, found
+                )
+                results.update(dict.fromkeys(found - changed, 'exists'))
+                results.update(dict.fromkeys(changed, 'created'))
+                delta = 1
+            else:
+                changed = delete_relations(
+                    model, relation_name, user.pk, found
+                )
+                results.update(dict.fromkeys(found - changed, 'missing'))
+                results.update(dict.fromkeys(changed, 'deleted'))
+                delta = -1
+            if counter:
+                bump(model_class, counter, changed, delta)
+
+        return Response({'results': [
+            {'id': pk, 'status': result} for pk, result in results.items()
+        ]})
+
+
+class CachedListMixin:
+    list_cache = None
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params or request.accepted_renderer.format != 'json':
+            return super().list(request, *args, **kwargs)
+        etag, body = self.list_cache.get(lambda: self.get_serializer(
+            self.filter_queryset(self.get_queryset()), many=True
+        ).data)
+        etags = parse_etags(request.headers.get('If-None-Match', ''))
+        if etag in etags or '*' in etags:
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = HttpResponse(body, content_type='application/json')
+        response['ETag'] = etag
+        return response
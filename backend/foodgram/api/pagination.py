@@ -1,5 +1,120 @@
-from rest_framework.pagination import PageNumberPagination
+import hashlib
+from collections import OrderedDict
 
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+
+COUNT_KEY = 'pagination-count:{}'
+
+
+class CachedCountPaginator(Paginator):
+    """Paginator, который запоминает COUNT по тексту SQL-запроса.
+
+    Считается запрос только по первичным ключам: аннотации, которые
+    нужны лишь для вывода (флаги текущего пользователя), из него
+    выпадают, поэтому одни и те же фильтры дают один ключ для всех.
+
+    Если задан PAGINATION_COUNT_ESTIMATE_THRESHOLD, на PostgreSQL
+    сначала берётся оценка планировщика из EXPLAIN; когда она выше
+    порога, точный COUNT не выполняется, и число считается примерным.
+    """
+
+    count_is_approximate = False
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list.order_by().values('pk')
+        try:
+            sql, params = queryset.query.sql_with_params()
+        except EmptyResultSet:
+            return 0
+        key = COUNT_KEY.format(
+            hashlib.sha1(repr((sql, params)).encode()).hexdigest()
+        )
+        cached = cache.get(key)
+        if cached is None:
+            cached = self.estimate(queryset.db, sql, params) or (
+                queryset.count(), False
+            )
+            cache.set(key, cached, settings.PAGINATION_COUNT_TTL)
+        count, self.count_is_approximate = cached
+        return count
+
+    def estimate(self, db, sql, params):
+        threshold = settings.PAGINATION_COUNT_ESTIMATE_THRESHOLD
+        connection = connections[db]
+        if threshold is None or connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            rows = cursor.fetchone()[0][0]['Plan']['Plan Rows']
+        if rows < threshold:
+            return None
+        return rows, True
+
+
+class CachedCountPagination(PageNumberPagination):
+    django_paginator_class = CachedCountPaginator
+
+    def get_paginated_response(self, data):
+        paginator = self.page.paginator
+        return Response(OrderedDict([
+            ('count', paginator.count),
+            ('count_is_approximate', paginator.count_is_approximate),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        schema = super().get_paginated_response_schema(schema)
+        schema['properties']['count_is_approximate'] = {
+            'type': 'boolean',
+            'example': False,
+        }
+        return schema
+
+
+class ModelOrderingCursorPagination(CursorPagination):
+    """Постраничный вывод по ключу из Meta.ordering модели, без COUNT."""
+
+    page_size_query_param = 'limit'
+
+    def get_ordering(self, request, queryset, view):
+        return queryset.query.order_by or queryset.model._meta.ordering
+
+
+class CustomPagination(CachedCountPagination):
+    """Номера страниц, а с параметром cursor — курсорный режим.
+
+    Запрос с ?cursor= (можно пустым) отдаёт первую страницу по курсору,
+    дальше клиент ходит по ссылкам next/previous.
+    """
 
-class CustomPagination(PageNumberPagination):
     page_size_query_param = "limit"
+    cursor_class = ModelOrderingCursorPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor = None
+        if self.cursor_class.cursor_query_param in request.query_params:
+            self.cursor = self.cursor_class()
+            page = self.cursor.paginate_queryset(queryset, request, view)
+            self.display_page_controls = self.cursor.display_page_controls
+            return page
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor:
+            return self.cursor.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def to_html(self):
+        if self.cursor:
+            return self.cursor.to_html()
+        return super().to_html()
@@ -1,11 +1,14 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import prefetch_related_objects
 from djoser.serializers import UserCreateSerializer
-from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                            ShoppingCart, Tag)
-from rest_framework import serializers, status
-from rest_framework.exceptions import ValidationError
+from recipes.models import (Ingredient, Recipe, RecipeIngredient, Tag,
+                            recipe_ingredients_prefetch)
+from rest_framework import serializers
 from users.models import Follow, User
 
-from .fields import Base64ImageField
+from .fields import (Base64ImageField, PrimaryKeyListField,
+                     RenditionImageField, ResolvingListSerializer)
 
 
 class CustomUserSerializer(UserCreateSerializer):
@@ -37,6 +40,8 @@ class UserSerializer(serializers.ModelSerializer):
         )
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         user = self.context['request'].user
         if user.is_authenticated:
             return Follow.objects.filter(user=user, author=obj).exists()
@@ -45,8 +50,8 @@ class UserSerializer(serializers.ModelSerializer):
 
 class FollowAuthorSerializer(serializers.ModelSerializer):
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
-    is_subscribed = serializers.SerializerMethodField()
+    recipes_count = serializers.IntegerField(read_only=True)
+    is_subscribed = serializers.BooleanField(read_only=True)
 
     class Meta:
         model = User
@@ -61,21 +66,10 @@ class FollowAuthorSerializer(serializers.ModelSerializer):
             'recipes_count',
         )
 
-    def get_is_subscribed(self, obj):
-        user = self.context.get('request').user
-        if user.is_authenticated:
-            return Follow.objects.filter(user=user, author=obj).exists()
-
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
-
     def get_recipes(self, obj):
-        request = self.context.get('request')
-        limit = request.GET.get('recipes_limit')
-        recipes = obj.recipes.all()
-        if limit:
-            recipes = recipes[:int(limit)]
-        serializer = RecipeSerializer(recipes, many=True, read_only=True)
+        serializer = RecipeSerializer(
+            obj.recipes.all(), many=True, read_only=True
+        )
         return serializer.data
 
 
@@ -116,7 +110,7 @@ class RecipeIngredientSerializer(serializers.ModelSerializer):
 
 
 class RecipeSerializer(serializers.ModelSerializer):
-    image = Base64ImageField(read_only=True)
+    image = RenditionImageField('thumbnail')
     name = serializers.ReadOnlyField()
 
     class Meta:
@@ -125,7 +119,7 @@ class RecipeSerializer(serializers.ModelSerializer):
 
 
 class RecipeSampleSerializer(serializers.ModelSerializer):
-    image = Base64ImageField()
+    image = RenditionImageField('thumbnail')
 
     class Meta:
         model = Recipe
@@ -138,14 +132,13 @@ class RecipeSampleSerializer(serializers.ModelSerializer):
 
 
 class RecipeIngredientCreateSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(
-        source='ingredient',
-        queryset=Ingredient.objects.all()
-    )
+    id = serializers.IntegerField(min_value=1, source='ingredient_id')
 
     class Meta:
         model = RecipeIngredient
         fields = ('id', 'amount')
+        list_serializer_class = ResolvingListSerializer
+        resolve_fields = {'ingredient': Ingredient.objects.all()}
 
 
 class RecipeGetSerializer(serializers.ModelSerializer):
@@ -153,10 +146,10 @@ class RecipeGetSerializer(serializers.ModelSerializer):
     tags = TagSerializer(
         many=True, read_only=True
     )
-    author = UserSerializer(read_only=True)
-    image = Base64ImageField(use_url=True)
-    is_favorited = serializers.SerializerMethodField(read_only=True)
-    is_in_shopping_cart = serializers.SerializerMethodField(read_only=True)
+    author = serializers.SerializerMethodField()
+    image = RenditionImageField('full', list_rendition='card')
+    is_favorited = serializers.BooleanField(read_only=True)
+    is_in_shopping_cart = serializers.BooleanField(read_only=True)
 
     class Meta:
         model = Recipe
@@ -173,27 +166,17 @@ class RecipeGetSerializer(serializers.ModelSerializer):
             'cooking_time',
         )
 
-    def get_is_in_shopping_cart(self, obj):
-        user = self.context.get('request').user
-        if user.is_authenticated:
-            return ShoppingCart.objects.filter(
-                user=user, recipe=obj
-            ).exists()
-        return False
-
-    def get_is_favorited(self, obj):
-        user = self.context.get('request').user
-        if user.is_authenticated:
-            return Favorite.objects.filter(
-                user=user,
-                recipe=obj
-            ).exists()
-        return False
+    def get_author(self, obj):
+        obj.author.is_subscribed = obj.author_is_subscribed
+        return UserSerializer(obj.author, context=self.context).data
 
     def get_ingredients(self, obj):
-        recipe_ingredient = RecipeIngredient.objects.filter(recipe=obj)
+        if 'recipe_ingredients' not in getattr(
+            obj, '_prefetched_objects_cache', {}
+        ):
+            prefetch_related_objects([obj], recipe_ingredients_prefetch())
         return RecipeIngredientSerializer(
-            recipe_ingredient,
+            obj.recipe_ingredients.all(),
             many=True
         ).data
 
@@ -202,7 +185,7 @@ class FollowSerializer(serializers.ModelSerializer):
     email = serializers.ReadOnlyField()
     username = serializers.ReadOnlyField()
     recipes = RecipeSerializer(many=True, read_only=True)
-    recipes_count = serializers.SerializerMethodField()
+    recipes_count = serializers.IntegerField(read_only=True)
     is_subscribed = serializers.SerializerMethodField()
 
     class Meta:
@@ -218,36 +201,16 @@ class FollowSerializer(serializers.ModelSerializer):
             'recipes_count'
         )
 
-    def validate(self, data):
-        user = self.context['request'].user
-        author = self.instance
-        if Follow.objects.filter(author=author, user=user).exists():
-            raise ValidationError(
-                detail='Нельзя подписываться на одного и того же!',
-                code=status.HTTP_400_BAD_REQUEST
-            )
-        if user == author:
-            raise ValidationError(
-                detail='Нельзя подписываться на самого себя!',
-                code=status.HTTP_400_BAD_REQUEST
-            )
-        return data
-
     def get_is_subscribed(self, obj):
         user = self.context.get('request').user
         if user.is_authenticated:
             return Follow.objects.filter(user=user, author=obj).exists()
         return False
 
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
-
 
 class RecipeCreateSerializer(serializers.ModelSerializer):
     ingredients = RecipeIngredientCreateSerializer(many=True)
-    tags = serializers.PrimaryKeyRelatedField(
-        many=True, queryset=Tag.objects.all()
-    )
+    tags = PrimaryKeyListField(queryset=Tag.objects.all())
     author = UserSerializer(read_only=True)
     image = Base64ImageField()
     id = serializers.ReadOnlyField()
@@ -300,6 +263,7 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
             )
         RecipeIngredient.objects.bulk_create(recipe_ingresient_list)
 
+    @transaction.atomic(savepoint=False)
     def create(self, validated_data):
         author = self.context.get('request').user
         ingredients_ = validated_data.pop('ingredients')
@@ -310,31 +274,66 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         )
         return recipe
 
-    def update(self, instance, validated_data):
-        instance.name = validated_data.get('name', instance.name)
-        instance.text = validated_data.get('text', instance.text)
-        instance.cooking_time = validated_data.get(
-            'cooking_time', instance.cooking_time
+    def update_ingredients(self, recipe, ingredients):
+        """Меняет только те строки состава, что действительно изменились."""
+        current = {
+            line.ingredient_id: line
+            for line in recipe.recipe_ingredients.all()
+        }
+        wanted = {
+            item['ingredient'].pk: item['amount'] for item in ingredients
+        }
+        changed = []
+        for ingredient_id, amount in wanted.items():
+            line = current.get(ingredient_id)
+            if line is not None and line.amount != amount:
+                line.amount = amount
+                changed.append(line)
+        if changed:
+            RecipeIngredient.objects.bulk_update(changed, ['amount'])
+        removed = current.keys() - wanted.keys()
+        if removed:
+            RecipeIngredient.objects.filter(
+                recipe=recipe, ingredient_id__in=removed
+            ).delete()
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, ingredient_id=pk, amount=amount)
+            for pk, amount in wanted.items() if pk not in current
         )
-        instance.image = validated_data.get('image', instance.image)
+
+    @transaction.atomic(savepoint=False)
+    def update(self, instance, validated_data):
         tags_ = validated_data.pop('tags')
-        instance.save()
         ingredients_ = validated_data.pop('ingredients')
-        RecipeIngredient.objects.filter(
-            recipe=instance,
-        ).delete()
-        self.recipe_ingredient(
-            recipe=instance,
-            tags=tags_,
-            ingredients=ingredients_
-        )
-        instance.save()
+        changed = []
+        for field in ('name', 'text', 'cooking_time', 'image'):
+            if field in validated_data and (
+                field == 'image'
+                or getattr(instance, field) != validated_data[field]
+            ):
+                setattr(instance, field, validated_data[field])
+                changed.append(field)
+        if changed:
+            instance.save(update_fields=changed)
+        instance.tags.set(tags_)
+        self.update_ingredients(instance, ingredients_)
         return instance
 
     def to_representation(self, instance):
         request = self.context.get('request')
         context = {'request': request}
+        instance = Recipe.objects.with_related().with_user_flags(
+            request.user
+        ).get(pk=instance.pk)
         return RecipeGetSerializer(
             instance,
             context=context
         ).data
+
+
+class RelationIdsSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.BULK_RELATION_MAX_IDS
+    )
@@ -0,0 +1,27 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from users.models import User
+
+from .authentication import token_cache
+
+
+def forget_tokens(keys):
+    # Второй раз после коммита: иначе параллельный запрос успеет
+    # положить в кеш ещё не изменённую строку.
+    token_cache.forget(keys)
+    transaction.on_commit(lambda: token_cache.forget(keys))
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(instance, **kwargs):
+    forget_tokens([instance.key])
+
+
+@receiver(post_save, sender=User)
+def user_changed(instance, created, **kwargs):
+    if not created:
+        forget_tokens(list(
+            Token.objects.filter(user=instance).values_list('key', flat=True)
+        ))
@@ -0,0 +1,31 @@
+# Допустимое число SQL-запросов на один вызов эндпоинта.
+# Списки проверяются на каждом размере страницы из PAGE_SIZES:
+# число запросов не должно превышать бюджет и не должно меняться
+# вместе с размером страницы.
+PAGE_SIZES = (1, 6, 20)
+
+QUERY_BUDGETS = {
+    'recipe-list': {'anonymous': 4, 'authenticated': 4},
+    'recipe-list-cursor': {'anonymous': 3, 'authenticated': 3},
+    'recipe-list-filtered': {'anonymous': 3, 'authenticated': 4},
+    'recipe-detail': {'anonymous': 3, 'authenticated': 3},
+    'recipe-create': {'anonymous': 0, 'authenticated': 10},
+    'recipe-update': {'anonymous': 0, 'authenticated': 11},
+    'recipe-delete': {'anonymous': 0, 'authenticated': 9},
+    'favorite': {'anonymous': 0, 'authenticated': 3},
+    'shopping-cart': {'anonymous': 0, 'authenticated': 2},
+    'download-shopping-cart': {'anonymous': 0, 'authenticated': 1},
+    'user-list': {'anonymous': 2, 'authenticated': 2},
+    'user-detail': {'anonymous': 0, 'authenticated': 1},
+    'user-me': {'anonymous': 0, 'authenticated': 1},
+    'subscriptions': {'anonymous': 0, 'authenticated': 3},
+    'subscriptions-cursor': {'anonymous': 0, 'authenticated': 2},
+    'subscribe': {'anonymous': 0, 'authenticated': 5},
+    'favorite-bulk': {'anonymous': 0, 'authenticated': 5},
+    'shopping-cart-bulk': {'anonymous': 0, 'authenticated': 4},
+    'subscribe-bulk': {'anonymous': 0, 'authenticated': 5},
+    'tag-list': {'anonymous': 1, 'authenticated': 1},
+    'tag-detail': {'anonymous': 1, 'authenticated': 1},
+    'ingredient-list': {'anonymous': 1, 'authenticated': 1},
+    'ingredient-detail': {'anonymous': 1, 'authenticated': 1},
+}
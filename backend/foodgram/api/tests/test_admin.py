@@ -0,0 +1,75 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart)
+from users.models import Follow, User
+
+CHANGELISTS = (
+    'recipes/recipe',
+    'recipes/ingredient',
+    'recipes/recipeingredient',
+    'recipes/favorite',
+    'recipes/shoppingcart',
+    'users/user',
+    'users/follow',
+)
+
+
+class AdminQueryTests(TestCase):
+    """Число запросов в админке не растёт вместе с числом строк."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@a.ru', password='admin'
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def add_rows(self, start, count):
+        recipes = []
+        for i in range(start, start + count):
+            user = User.objects.create(username=f'user{i}', email=f'{i}@a.ru')
+            recipe = Recipe.objects.create(
+                name=f'Рецепт {i}', text='-', cooking_time=1, author=user
+            )
+            RecipeIngredient.objects.create(
+                recipe=recipe, amount=1,
+                ingredient=Ingredient.objects.create(
+                    name=f'ингредиент {i}', measurement_unit='г'
+                )
+            )
+            Favorite.objects.create(user=user, recipe=recipe)
+            ShoppingCart.objects.create(user=user, recipe=recipe)
+            Follow.objects.create(user=user, author=self.admin)
+            recipes.append(recipe)
+        return recipes
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return len(queries)
+
+    def test_changelists_do_not_grow(self):
+        self.add_rows(0, 1)
+        before = {
+            name: self.count_queries(f'/admin/{name}/')
+            for name in CHANGELISTS
+        }
+        self.add_rows(1, 30)
+        for name in CHANGELISTS:
+            with self.subTest(changelist=name):
+                self.assertEqual(
+                    self.count_queries(f'/admin/{name}/'), before[name]
+                )
+
+    def test_recipe_change_form_does_not_grow(self):
+        recipe, = self.add_rows(0, 1)
+        url = f'/admin/recipes/recipe/{recipe.pk}/change/'
+        self.client.get(url)
+        before = self.count_queries(url)
+        self.add_rows(1, 30)
+        self.assertEqual(self.count_queries(url), before)
@@ -0,0 +1,96 @@
+import pickle
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from users.models import Follow, User
+
+from ..authentication import TOKEN_KEY, TokenCache, token_cache
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='user', email='u@u.ru')
+        cls.token = Token.objects.create(user=cls.user)
+
+    def setUp(self):
+        token_cache.clear()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_cached_token_skips_query(self):
+        with CaptureQueriesContext(connection) as cold:
+            self.assertEqual(
+                self.client.get('/api/users/me/').status_code, 200
+            )
+        with CaptureQueriesContext(connection) as warm:
+            response = self.client.get('/api/users/me/')
+        self.assertEqual(len(warm), len(cold) - 1)
+        self.assertEqual(response.data['username'], 'user')
+
+    def test_logout_invalidates(self):
+        self.client.get('/api/users/me/')
+        response = self.client.post('/api/auth/token/logout/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 401)
+
+    def test_password_change_keeps_counters(self):
+        self.user.set_password('old-password-1')
+        self.user.save()
+        self.client.get('/api/users/me/')
+        follower = User.objects.create(username='fan', email='f@f.ru')
+        Follow.objects.create(user=follower, author=self.user)
+        response = self.client.post('/api/users/set_password/', {
+            'current_password': 'old-password-1',
+            'new_password': 'new-password-2',
+        })
+        self.assertEqual(response.status_code, 204, response.data)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.followers_count, 1)
+        self.assertTrue(self.user.check_password('new-password-2'))
+
+    def test_password_hash_not_cached(self):
+        self.user.set_password('old-password-1')
+        self.user.save()
+        self.client.get('/api/users/me/')
+        cached = pickle.dumps(cache.get(TOKEN_KEY.format(self.token.key)))
+        self.assertNotIn(self.user.password.encode(), cached)
+
+    def test_deactivation_invalidates(self):
+        self.client.get('/api/users/me/')
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 401)
+
+
+class TokenCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(TOKEN_CACHE_SIZE=2)
+    def test_evicts_least_recently_used(self):
+        tokens = TokenCache()
+        for key in 'abc':
+            tokens.remember(key, None, key)
+        self.assertEqual(list(tokens.entries), ['b', 'c'])
+
+    @override_settings(TOKEN_CACHE_TTL=10)
+    def test_expires(self):
+        tokens = TokenCache()
+        with mock.patch('time.monotonic', return_value=0):
+            tokens.remember('a', None, 'old')
+        with mock.patch('time.monotonic', return_value=11):
+            self.assertEqual(tokens.get_or_load('a', lambda: 'new'), 'new')
+
+    def test_forget_reaches_other_workers(self):
+        worker, other = TokenCache(), TokenCache()
+        self.assertEqual(worker.get_or_load('a', lambda: 'old'), 'old')
+        self.assertEqual(other.get_or_load('a', lambda: 'unused'), 'old')
+        worker.forget(['a'])
+        self.assertEqual(other.get_or_load('a', lambda: 'new'), 'new')
+        self.assertEqual(worker.get_or_load('a', lambda: 'unused'), 'new')
@@ -0,0 +1,72 @@
+from django.test import TestCase
+from recipes.counters import COUNTERS, reconcile
+from recipes.models import Favorite, Recipe
+from rest_framework.test import APIClient
+from users.models import Follow, User
+
+
+class CounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='user', email='u@u.ru')
+        cls.author = User.objects.create(username='author', email='a@a.ru')
+        cls.recipe = Recipe.objects.create(
+            name='Рецепт', text='-', cooking_time=1, author=cls.author
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertCounts(self, favorites, recipes, followers):
+        self.recipe.refresh_from_db()
+        self.author.refresh_from_db()
+        self.assertEqual(
+            (self.recipe.favorites_count, self.author.recipes_count,
+             self.author.followers_count),
+            (favorites, recipes, followers)
+        )
+
+    def test_api_actions_update_counters(self):
+        self.assertCounts(0, 1, 0)
+        url = f'/api/recipes/{self.recipe.pk}/favorite/'
+        self.client.post(url)
+        self.client.post(url)
+        subscribe = f'/api/users/{self.author.pk}/subscribe/'
+        self.client.post(subscribe)
+        self.assertCounts(1, 1, 1)
+        response = self.client.get('/api/users/subscriptions/')
+        self.assertEqual(response.data['results'][0]['recipes_count'], 1)
+        self.client.delete(url)
+        self.client.delete(subscribe)
+        self.assertCounts(0, 1, 0)
+        self.recipe.delete()
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.recipes_count, 0)
+
+    def test_reconcile_fixes_bulk_inserts(self):
+        Favorite.objects.bulk_create([
+            Favorite(user=self.user, recipe=self.recipe)
+        ])
+        Follow.objects.bulk_create([
+            Follow(user=self.user, author=self.author)
+        ])
+        User.objects.filter(pk=self.author.pk).update(recipes_count=5)
+        fixed = sum(
+            sum(reconcile(*counter, batch_size=1)) for counter in COUNTERS
+        )
+        self.assertEqual(fixed, 3)
+        self.assertCounts(1, 1, 1)
+
+    def test_save_keeps_counters(self):
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        author = User.objects.get(pk=self.author.pk)
+        Favorite.objects.create(user=self.user, recipe=self.recipe)
+        Follow.objects.create(user=self.user, author=self.author)
+        recipe.name = 'Новое имя'
+        recipe.save()
+        author.first_name = 'Автор'
+        author.save()
+        self.assertCounts(1, 1, 1)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.name, 'Новое имя')
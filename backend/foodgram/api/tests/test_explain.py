@@ -0,0 +1,26 @@
+from django.db import connection
+from django.test import TestCase
+from recipes.models import Recipe
+from users.models import User
+
+from ..explain import PlanAuditor
+
+
+class PlanAuditorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create(username='author', email='a@a.ru')
+        Recipe.objects.bulk_create(
+            Recipe(name=f'Рецепт {i}', text='-', cooking_time=1,
+                   author=author)
+            for i in range(3)
+        )
+
+    def test_flags_full_scan(self):
+        sql = str(Recipe.objects.filter(cooking_time=1).order_by().query)
+        self.assertTrue(PlanAuditor(connection, min_rows=1).audit(sql))
+
+    def test_ignores_small_tables_and_writes(self):
+        auditor = PlanAuditor(connection, min_rows=1000)
+        self.assertEqual(auditor.audit(str(Recipe.objects.all().query)), [])
+        self.assertEqual(auditor.audit('DELETE FROM recipes_recipe'), [])
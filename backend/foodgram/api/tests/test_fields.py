@@ -0,0 +1,54 @@
+import base64
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+from rest_framework.serializers import ValidationError
+
+from ..fields import Base64ImageField
+
+PNG = (
+    'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAA'
+    'DUlEQVR42mP8z8BQDwAEhQGAhKmMIQAAAABJRU5ErkJggg=='
+)
+
+
+class Base64ImageFieldTests(SimpleTestCase):
+    def decode(self, data):
+        return Base64ImageField().to_internal_value(data)
+
+    def assertRejected(self, data, code):
+        with self.assertRaises(ValidationError) as context:
+            self.decode(data)
+        self.assertEqual(context.exception.detail[0].code, code)
+
+    def test_decodes_png(self):
+        upload = self.decode(f'data:image/png;base64,{PNG}')
+        self.assertEqual(upload.name, 'temp.png')
+        self.assertEqual(upload.content_type, 'image/png')
+        self.assertEqual(upload.read(8), b'\x89PNG\r\n\x1a\n')
+
+    def test_skips_whitespace(self):
+        wrapped = '\n'.join(PNG[i:i + 76] for i in range(0, len(PNG), 76))
+        upload = self.decode(f'data:image/png;base64, {wrapped}\r\n')
+        self.assertEqual(upload.read(8), b'\x89PNG\r\n\x1a\n')
+
+    @mock.patch('api.fields.CHUNK_SIZE', 5)
+    def test_whitespace_across_chunks(self):
+        spaced = ' '.join(PNG[i:i + 3] for i in range(0, len(PNG), 3))
+        upload = self.decode(f'data:image/png;base64,{spaced}')
+        self.assertEqual(upload.size, len(base64.b64decode(PNG)))
+
+    def test_rejects_declared_type_mismatch(self):
+        self.assertRejected(f'data:image/jpeg;base64,{PNG}', 'mime_mismatch')
+
+    def test_rejects_invalid_payload(self):
+        self.assertRejected('data:image/png;base64,!!!!', 'invalid_image')
+        self.assertRejected('data:image/png;base64,AAAA', 'invalid_image')
+        self.assertRejected(
+            f'data:image/png;base64,{PNG[:-1]}', 'invalid_image'
+        )
+        self.assertRejected(f'data:image/png,{PNG}', 'invalid_image')
+
+    @override_settings(IMAGE_UPLOAD_MAX_SIZE=32)
+    def test_rejects_large_image(self):
+        self.assertRejected(f'data:image/png;base64,{PNG}', 'too_large')
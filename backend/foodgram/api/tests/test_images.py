@@ -0,0 +1,48 @@
+import base64
+import shutil
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from recipes.images import RENDITIONS, rendition_url
+from recipes.models import Recipe
+from users.models import User
+
+from .test_fields import PNG
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class RecipeImageTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def create_recipe(self, image):
+        return Recipe.objects.create(
+            name='Рецепт', text='Описание', cooking_time=1,
+            author=User.objects.get_or_create(username='author')[0],
+            image=image
+        )
+
+    def test_identical_uploads_share_files(self):
+        first, second = (
+            self.create_recipe(ContentFile(base64.b64decode(PNG), 'a.png'))
+            for _ in range(2)
+        )
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertRegex(first.image.name, r'^recipes/[0-9a-f]{40}\.png$')
+        for rendition in RENDITIONS:
+            url = rendition_url(first.image, rendition)
+            self.assertTrue(url.endswith(f'/{rendition}.webp'))
+            self.assertTrue(first.image.storage.exists(
+                url[len('/media/'):]
+            ))
+
+    def test_legacy_image_falls_back_to_original(self):
+        recipe = self.create_recipe('temp.png')
+        self.assertEqual(
+            rendition_url(recipe.image, 'card'), '/media/temp.png'
+        )
@@ -0,0 +1,41 @@
+import io
+import json
+from unittest import mock
+
+from django.test import TestCase
+from recipes import loaders
+from recipes.models import Ingredient
+
+ROWS = [
+    {'name': f'ингредиент {i}', 'measurement_unit': 'г'} for i in range(50)
+]
+
+
+class IngredientLoaderTests(TestCase):
+    def test_read_json_across_chunks(self):
+        file = io.StringIO(json.dumps(ROWS, ensure_ascii=False, indent=1))
+        with mock.patch.object(loaders, 'READ_SIZE', 7):
+            rows = list(loaders.read_json(file))
+        self.assertEqual(
+            rows, [(row['name'], row['measurement_unit']) for row in ROWS]
+        )
+
+    def test_read_json_rejects_unclosed_array(self):
+        with self.assertRaises(ValueError):
+            list(loaders.read_json(io.StringIO('[{"name": "соль"')))
+
+    def test_load_is_idempotent(self):
+        rows = [('соль', 'г'), ('соль', 'г'), (' перец ', 'г'), ('', 'г')]
+        created, skipped = loaders.load_ingredients(rows, batch_size=2)
+        self.assertEqual((created, skipped.count), (2, 1))
+        created, _ = loaders.load_ingredients(rows, batch_size=2)
+        self.assertEqual(created, 0)
+        self.assertTrue(Ingredient.objects.filter(name='перец').exists())
+
+    def test_rows_without_unit_are_skipped(self):
+        rows = loaders.read_csv(io.StringIO('соль,г\nперец\nукроп, \n'))
+        created, skipped = loaders.load_ingredients(rows)
+        self.assertEqual((created, skipped.count), (1, 2))
+        self.assertFalse(
+            Ingredient.objects.filter(measurement_unit='').exists()
+        )
@@ -0,0 +1,484 @@
+import os
+import random
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from recipes import shopping_list
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, Tag)
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient, APITestCase
+from users.models import Follow, User
+
+from ..authentication import CachedTokenAuthentication, token_cache
+from .query_budgets import PAGE_SIZES, QUERY_BUDGETS
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+
+IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAA'
+    'DUlEQVR42mP8z8BQDwAEhQGAhKmMIQAAAABJRU5ErkJggg=='
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class QueryBudgetTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        rnd = random.Random(0)
+        cls.tags = [
+            Tag.objects.create(
+                name=f'Тег {i}', color=f'#00000{i}', slug=f'tag{i}'
+            )
+            for i in range(3)
+        ]
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f'Ингредиент {i}', measurement_unit='г')
+            for i in range(60)
+        )
+        cls.ingredients = list(Ingredient.objects.all())
+        User.objects.bulk_create(
+            User(username=f'user{i}', email=f'user{i}@foodgram.ru')
+            for i in range(30)
+        )
+        cls.users = list(User.objects.all())
+        cls.user = cls.users[0]
+        cls.token = Token.objects.create(user=cls.user)
+        for i in range(45):
+            recipe = Recipe.objects.create(
+                name=f'Рецепт {i}',
+                text='Описание',
+                cooking_time=rnd.randint(1, 120),
+                author=cls.users[1 + i % 25],
+            )
+            recipe.tags.set(rnd.sample(cls.tags, rnd.randint(1, 3)))
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(
+                    recipe=recipe, ingredient=ingredient,
+                    amount=rnd.randint(1, 500)
+                )
+                for ingredient in rnd.sample(
+                    cls.ingredients, rnd.randint(4, 12)
+                )
+            )
+        cls.recipes = list(Recipe.objects.all())
+        Favorite.objects.bulk_create(
+            Favorite(user=cls.user, recipe=recipe)
+            for recipe in cls.recipes[::2]
+        )
+        ShoppingCart.objects.bulk_create(
+            ShoppingCart(user=cls.user, recipe=recipe)
+            for recipe in cls.recipes[::3]
+        )
+        Follow.objects.bulk_create(
+            Follow(user=cls.user, author=author)
+            for author in cls.users[1:26]
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        # Токен уже в кеше, как в работающем процессе.
+        token_cache.clear()
+        CachedTokenAuthentication().authenticate_credentials(self.token.key)
+        self.anonymous = APIClient()
+        self.authenticated = APIClient()
+        self.authenticated.credentials(
+            HTTP_AUTHORIZATION=f'Token {self.token.key}'
+        )
+
+    def clients(self):
+        return (
+            ('anonymous', self.anonymous),
+            ('authenticated', self.authenticated),
+        )
+
+    def count_queries(self, client, method, url, data=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(client, method)(url, data, format='json')
+            if response.streaming:
+                b''.join(response.streaming_content)
+        return response, len(queries)
+
+    def assertWithinBudget(self, endpoint, viewer, queries):
+        budget = QUERY_BUDGETS[endpoint][viewer]
+        self.assertLessEqual(
+            queries, budget,
+            f'{endpoint} ({viewer}): {queries} запросов, бюджет {budget}'
+        )
+
+    def check_paginated(self, endpoint, url, viewers=None):
+        for viewer, client in self.clients():
+            if viewers and viewer not in viewers:
+                continue
+            counts = {}
+            for page_size in PAGE_SIZES:
+                cache.clear()
+                with self.subTest(endpoint=endpoint, viewer=viewer,
+                                  limit=page_size):
+                    response, queries = self.count_queries(
+                        client, 'get', f'{url}limit={page_size}'
+                    )
+                    counts[page_size] = queries
+                    self.assertEqual(response.status_code, status.HTTP_200_OK)
+                    self.assertWithinBudget(endpoint, viewer, queries)
+            self.assertEqual(
+                len(set(counts.values())), 1,
+                f'{endpoint} ({viewer}): число запросов растёт с размером '
+                f'страницы: {counts}'
+            )
+
+    def check_single(self, endpoint, method, url, expected, data=None):
+        for viewer, client in self.clients():
+            with self.subTest(endpoint=endpoint, viewer=viewer):
+                response, queries = self.count_queries(
+                    client, method, url, data
+                )
+                self.assertEqual(
+                    response.status_code, expected[viewer],
+                    None if response.streaming else response.content
+                )
+                self.assertWithinBudget(endpoint, viewer, queries)
+
+    def test_recipe_list(self):
+        self.check_paginated('recipe-list', '/api/recipes/?')
+
+    def test_recipe_list_filtered(self):
+        author = self.recipes[0].author_id
+        self.check_paginated(
+            'recipe-list-filtered',
+            f'/api/recipes/?tags=tag0&tags=tag1&author={author}&'
+        )
+        self.check_paginated(
+            'recipe-list-filtered',
+            '/api/recipes/?is_favorited=1&is_in_shopping_cart=1&',
+            viewers=('authenticated',)
+        )
+
+    def test_recipe_list_tags(self):
+        response = self.anonymous.get(
+            '/api/recipes/?tags=tag0&tags=tag1&tags=tag2&limit=100'
+        )
+        ids = [item['id'] for item in response.data['results']]
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(response.data['count'], len(self.recipes))
+        response = self.anonymous.get('/api/recipes/?tags=unknown')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_recipe_list_cursor(self):
+        self.check_paginated('recipe-list-cursor', '/api/recipes/?cursor=&')
+        self.check_paginated(
+            'subscriptions-cursor', '/api/users/subscriptions/?cursor=&',
+            viewers=('authenticated',)
+        )
+
+    def test_recipe_list_cached_count(self):
+        url = f'/api/recipes/?author={self.users[1].id}&limit=1'
+        response, first = self.count_queries(self.anonymous, 'get', url)
+        self.assertFalse(response.data['count_is_approximate'])
+        count = response.data['count']
+        _, second = self.count_queries(
+            self.anonymous, 'get', f'{url}&page=2'
+        )
+        self.assertEqual(second, first - 1)
+        response, _ = self.count_queries(self.authenticated, 'get', url)
+        self.assertEqual(response.data['count'], count)
+
+    def test_cached_count_shared_between_viewers(self):
+        url = '/api/recipes/?tags=tag1&limit=1'
+        self.count_queries(self.anonymous, 'get', url)
+        _, first = self.count_queries(self.authenticated, 'get', url)
+        _, again = self.count_queries(self.authenticated, 'get', url)
+        self.assertEqual(first, again)
+
+    def walk_cursor(self, url):
+        ids = []
+        while url:
+            response = self.authenticated.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            ids.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    def test_cursor_matches_page_numbers(self):
+        for url in (
+            '/api/recipes/?limit=7',
+            '/api/recipes/?limit=7&tags=tag0&tags=tag2',
+            '/api/recipes/?limit=7&is_favorited=1&is_in_shopping_cart=0',
+            f'/api/recipes/?limit=7&author={self.users[1].id}',
+            '/api/users/subscriptions/?limit=7&recipes_limit=1',
+        ):
+            with self.subTest(url=url):
+                response = self.authenticated.get(f'{url}&limit=1000')
+                expected = [item['id'] for item in response.data['results']]
+                self.assertEqual(self.walk_cursor(f'{url}&cursor='), expected)
+
+    def test_recipe_detail(self):
+        self.check_single(
+            'recipe-detail', 'get', f'/api/recipes/{self.recipes[0].id}/',
+            {'anonymous': 200, 'authenticated': 200}
+        )
+
+    def recipe_payload(self, ingredient_count):
+        return {
+            'name': 'Новый рецепт',
+            'text': 'Описание',
+            'cooking_time': 10,
+            'image': IMAGE,
+            'tags': [tag.id for tag in self.tags],
+            'ingredients': [
+                {'id': ingredient.id, 'amount': 10}
+                for ingredient in self.ingredients[:ingredient_count]
+            ],
+        }
+
+    def test_recipe_create_and_update(self):
+        self.check_single(
+            'recipe-create', 'post', '/api/recipes/',
+            {'anonymous': 401, 'authenticated': 201},
+            self.recipe_payload(10)
+        )
+        recipe = Recipe.objects.filter(author=self.user).first()
+        self.check_single(
+            'recipe-update', 'patch', f'/api/recipes/{recipe.id}/',
+            {'anonymous': 401, 'authenticated': 200},
+            self.recipe_payload(12)
+        )
+        self.check_single(
+            'recipe-delete', 'delete', f'/api/recipes/{recipe.id}/',
+            {'anonymous': 401, 'authenticated': 204}
+        )
+
+    def test_favorite(self):
+        recipe = self.recipes[1]
+        self.check_single(
+            'favorite', 'post', f'/api/recipes/{recipe.id}/favorite/',
+            {'anonymous': 401, 'authenticated': 201}
+        )
+        self.check_single(
+            'favorite', 'delete', f'/api/recipes/{recipe.id}/favorite/',
+            {'anonymous': 401, 'authenticated': 204}
+        )
+
+    def test_shopping_cart(self):
+        recipe = self.recipes[1]
+        self.check_single(
+            'shopping-cart', 'post',
+            f'/api/recipes/{recipe.id}/shopping_cart/',
+            {'anonymous': 401, 'authenticated': 201}
+        )
+        self.check_single(
+            'shopping-cart', 'delete',
+            f'/api/recipes/{recipe.id}/shopping_cart/',
+            {'anonymous': 401, 'authenticated': 204}
+        )
+
+    def test_download_shopping_cart(self):
+        for format in ('', 'pdf', 'txt', 'csv', 'json'):
+            self.check_single(
+                'download-shopping-cart', 'get',
+                f'/api/recipes/download_shopping_cart/?format={format}',
+                {'anonymous': 401, 'authenticated': 200}
+            )
+
+    def test_download_shopping_cart_cached(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        url = '/api/recipes/download_shopping_cart/'
+        first = b''.join(client.get(url).streaming_content)
+        with override_settings(SHOPPING_LIST_ACCEL_REDIRECT=True):
+            response = client.get(url)
+        self.assertTrue(
+            response['X-Accel-Redirect'].startswith('/media/shopping_lists/')
+        )
+        directory = Path(TEMP_MEDIA_ROOT) / 'shopping_lists' / str(
+            self.user.pk
+        )
+        old, = directory.iterdir()
+        ShoppingCart.objects.create(user=self.user, recipe=self.recipes[1])
+        second = b''.join(client.get(url).streaming_content)
+        self.assertNotEqual(first, second)
+        self.assertEqual(len(list(directory.iterdir())), 2)
+        stale = time.time() - shopping_list.STALE_AFTER - 1
+        os.utime(old, (stale, stale))
+        ShoppingCart.objects.create(user=self.user, recipe=self.recipes[2])
+        client.get(url)
+        self.assertNotIn(old, list(directory.iterdir()))
+
+    def test_download_shopping_cart_file_removed(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        url = '/api/recipes/download_shopping_cart/'
+        client.get(url)
+        shutil.rmtree(Path(TEMP_MEDIA_ROOT) / 'shopping_lists')
+        with mock.patch.object(Path, 'exists', return_value=True):
+            response = client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(
+            b''.join(response.streaming_content).startswith(b'%PDF')
+        )
+
+    def test_download_shopping_cart_render_timeout(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        future = mock.Mock()
+        future.result.side_effect = shopping_list.futures.TimeoutError
+        with mock.patch.object(
+            shopping_list, 'render_in_background', return_value=future
+        ):
+            response = client.get('/api/recipes/download_shopping_cart/')
+        self.assertEqual(
+            response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+        self.assertEqual(
+            response['Retry-After'], str(shopping_list.RETRY_AFTER)
+        )
+
+    def test_user_list(self):
+        self.check_paginated('user-list', '/api/users/?')
+
+    def test_user_detail(self):
+        self.check_single(
+            'user-detail', 'get', f'/api/users/{self.users[1].id}/',
+            {'anonymous': 401, 'authenticated': 200}
+        )
+        self.check_single(
+            'user-me', 'get', '/api/users/me/',
+            {'anonymous': 401, 'authenticated': 200}
+        )
+
+    def test_subscriptions(self):
+        self.check_paginated(
+            'subscriptions', '/api/users/subscriptions/?',
+            viewers=('authenticated',)
+        )
+        self.check_paginated(
+            'subscriptions', '/api/users/subscriptions/?recipes_limit=2&',
+            viewers=('authenticated',)
+        )
+
+    def test_subscriptions_zero_recipes_limit(self):
+        response = self.authenticated.get(
+            '/api/users/subscriptions/?recipes_limit=0'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['results'])
+        for author in response.data['results']:
+            self.assertEqual(author['recipes'], [])
+
+    def test_subscriptions_empty(self):
+        client = APIClient()
+        client.force_authenticate(self.users[29])
+        response = client.get('/api/users/subscriptions/?recipes_limit=2')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'], [])
+
+    def test_subscribe(self):
+        author = self.users[27]
+        self.check_single(
+            'subscribe', 'post', f'/api/users/{author.id}/subscribe/',
+            {'anonymous': 401, 'authenticated': 201}
+        )
+        self.check_single(
+            'subscribe', 'delete', f'/api/users/{author.id}/subscribe/',
+            {'anonymous': 401, 'authenticated': 204}
+        )
+
+    def check_bulk(self, endpoint, url, id_lists):
+        """Каждый вызов меняет все id; число запросов от них не зависит."""
+        for method, result in (('post', 'created'), ('delete', 'deleted')):
+            counts = {}
+            for ids in id_lists:
+                with self.subTest(endpoint=endpoint, method=method,
+                                  size=len(ids)):
+                    response, _ = self.count_queries(
+                        self.anonymous, method, url, {'ids': ids}
+                    )
+                    self.assertEqual(response.status_code, 401)
+                    response, queries = self.count_queries(
+                        self.authenticated, method, url, {'ids': ids}
+                    )
+                    self.assertEqual(
+                        response.status_code, status.HTTP_200_OK
+                    )
+                    self.assertEqual(
+                        {item['status'] for item in response.data['results']},
+                        {result}
+                    )
+                    self.assertWithinBudget(endpoint, 'authenticated', queries)
+                    counts[len(ids)] = queries
+            self.assertEqual(
+                len(set(counts.values())), 1,
+                f'{endpoint}: число запросов растёт с числом id: {counts}'
+            )
+
+    def test_favorite_bulk(self):
+        self.check_bulk('favorite-bulk', '/api/recipes/favorite/', [
+            [recipe.id for recipe in self.recipes[1:4:2]],
+            [recipe.id for recipe in self.recipes[5:45:2]],
+        ])
+
+    def test_shopping_cart_bulk(self):
+        self.check_bulk('shopping-cart-bulk', '/api/recipes/shopping_cart/', [
+            [recipe.id for recipe in self.recipes[1:3]],
+            [recipe.id for recipe in self.recipes[4:45:3]],
+        ])
+
+    def test_subscribe_bulk(self):
+        self.check_bulk('subscribe-bulk', '/api/users/subscribe/', [
+            [self.users[26].id],
+            [user.id for user in self.users[27:]],
+        ])
+
+    def test_tags(self):
+        self.check_single(
+            'tag-list', 'get', '/api/tags/',
+            {'anonymous': 200, 'authenticated': 200}
+        )
+        self.check_single(
+            'tag-detail', 'get', f'/api/tags/{self.tags[0].id}/',
+            {'anonymous': 200, 'authenticated': 200}
+        )
+
+    def test_catalog_cache(self):
+        response = self.anonymous.get('/api/tags/')
+        self.assertEqual(len(response.json()), len(self.tags))
+        response, queries = self.count_queries(
+            self.anonymous, 'get', '/api/tags/'
+        )
+        self.assertEqual(queries, 0)
+        response = self.anonymous.get(
+            '/api/tags/', HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        Tag.objects.create(name='Новый', color='#FFFFFF', slug='new')
+        response = self.anonymous.get('/api/tags/')
+        self.assertEqual(len(response.json()), len(self.tags) + 1)
+
+    def test_ingredients(self):
+        self.check_single(
+            'ingredient-list', 'get', '/api/ingredients/',
+            {'anonymous': 200, 'authenticated': 200}
+        )
+        self.check_single(
+            'ingredient-list', 'get', '/api/ingredients/?name=ингр',
+            {'anonymous': 200, 'authenticated': 200}
+        )
+        self.check_single(
+            'ingredient-detail', 'get',
+            f'/api/ingredients/{self.ingredients[0].id}/',
+            {'anonymous': 200, 'authenticated': 200}
+        )
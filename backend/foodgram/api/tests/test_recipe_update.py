@@ -0,0 +1,107 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from recipes.models import Favorite, Ingredient, Recipe, RecipeIngredient, Tag
+from rest_framework.test import APIClient
+from users.models import User
+
+
+class RecipeUpdateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='author', email='a@a.ru')
+        cls.tags = [
+            Tag.objects.create(name=slug, color=color, slug=slug)
+            for slug, color in (('a', '#000000'), ('b', '#FFFFFF'))
+        ]
+        cls.ingredients = [
+            Ingredient.objects.create(name=f'ингр {i}', measurement_unit='г')
+            for i in range(4)
+        ]
+
+    def setUp(self):
+        self.recipe = Recipe.objects.create(
+            name='Рецепт', text='-', cooking_time=1, author=self.author
+        )
+        self.recipe.tags.set(self.tags[:1])
+        for ingredient in self.ingredients[:3]:
+            RecipeIngredient.objects.create(
+                recipe=self.recipe, ingredient=ingredient, amount=10
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def test_only_changed_lines_are_written(self):
+        kept, changed, removed, added = self.ingredients
+        lines = {
+            line.ingredient_id: line.pk
+            for line in self.recipe.recipe_ingredients.all()
+        }
+        response = self.client.patch(
+            f'/api/recipes/{self.recipe.pk}/', {
+                'name': 'Новое имя',
+                'tags': [tag.pk for tag in self.tags],
+                'ingredients': [
+                    {'id': kept.pk, 'amount': 10},
+                    {'id': changed.pk, 'amount': 20},
+                    {'id': added.pk, 'amount': 5},
+                ],
+            }, format='json'
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        current = {
+            line.ingredient_id: (line.pk, line.amount)
+            for line in self.recipe.recipe_ingredients.all()
+        }
+        self.assertEqual(current[kept.pk], (lines[kept.pk], 10))
+        self.assertEqual(current[changed.pk], (lines[changed.pk], 20))
+        self.assertNotIn(removed.pk, current)
+        self.assertEqual(current[added.pk][1], 5)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.name, 'Новое имя')
+        self.assertEqual(self.recipe.tags.count(), 2)
+
+    def test_missing_ids_reported_together(self):
+        response = self.client.patch(
+            f'/api/recipes/{self.recipe.pk}/', {
+                'tags': [self.tags[0].pk, 998, 999],
+                'ingredients': [
+                    {'id': self.ingredients[0].pk, 'amount': 1},
+                    {'id': 997, 'amount': 1},
+                    {'id': 996, 'amount': 1},
+                ],
+            }, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.data['tags'], ['Нет объектов с id: 998, 999.']
+        )
+        self.assertEqual(
+            response.data['ingredients'], ['Нет объектов с id: 996, 997.']
+        )
+
+    def test_update_writes_only_changed_columns(self):
+        Favorite.objects.create(user=self.author, recipe=self.recipe)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(
+                f'/api/recipes/{self.recipe.pk}/', {
+                    'name': 'Рецепт',
+                    'cooking_time': 5,
+                    'tags': [self.tags[0].pk],
+                    'ingredients': [
+                        {'id': ingredient.pk, 'amount': 10}
+                        for ingredient in self.ingredients[:3]
+                    ],
+                }, format='json'
+            )
+        self.assertEqual(response.status_code, 200, response.data)
+        updates = [
+            query['sql'] for query in queries
+            if query['sql'].startswith('UPDATE "recipes_recipe"')
+        ]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"cooking_time"', updates[0])
+        self.assertNotIn('"favorites_count"', updates[0])
+        self.assertNotIn('"name"', updates[0])
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.favorites_count, 1)
@@ -0,0 +1,103 @@
+from django.test import TestCase
+from recipes.models import Favorite, Recipe, ShoppingCart
+from rest_framework.test import APIClient
+from users.models import Follow, User
+
+from ..mixins import delete_relations, insert_relations
+
+
+class RelationActionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='user', email='u@u.ru')
+        cls.author = User.objects.create(username='author', email='a@a.ru')
+        cls.recipe = Recipe.objects.create(
+            name='Рецепт', text='-', cooking_time=1, author=cls.author
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_status_follows_affected_rows(self):
+        url = f'/api/recipes/{self.recipe.pk}/shopping_cart/'
+        self.assertEqual(self.client.post(url).status_code, 201)
+        self.assertEqual(self.client.post(url).status_code, 400)
+        self.assertEqual(ShoppingCart.objects.count(), 1)
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assertEqual(self.client.delete(url).status_code, 400)
+        self.assertEqual(ShoppingCart.objects.count(), 0)
+
+    def test_missing_target(self):
+        for url in ('/api/recipes/999/favorite/', '/api/users/999/subscribe/'):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.post(url).status_code, 404)
+                self.assertEqual(self.client.delete(url).status_code, 404)
+
+    def test_subscribe(self):
+        url = f'/api/users/{self.author.pk}/subscribe/'
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['recipes_count'], 1)
+        self.assertEqual(self.client.post(url).status_code, 400)
+        self.assertEqual(Follow.objects.count(), 1)
+        response = self.client.post(f'/api/users/{self.user.pk}/subscribe/')
+        self.assertEqual(response.status_code, 400)
+
+    def test_bulk_results_per_id(self):
+        other = Recipe.objects.create(
+            name='Другой', text='-', cooking_time=1, author=self.author
+        )
+        self.client.post(f'/api/recipes/{self.recipe.pk}/favorite/')
+        ids = [self.recipe.pk, other.pk, 999, other.pk]
+        response = self.client.post(
+            '/api/recipes/favorite/', {'ids': ids}, format='json'
+        )
+        self.assertEqual(response.data['results'], [
+            {'id': self.recipe.pk, 'status': 'exists'},
+            {'id': other.pk, 'status': 'created'},
+            {'id': 999, 'status': 'not_found'},
+        ])
+        other.refresh_from_db()
+        self.assertEqual(other.favorites_count, 1)
+        response = self.client.delete(
+            '/api/recipes/favorite/', {'ids': [other.pk]}, format='json'
+        )
+        self.assertEqual(
+            response.data['results'], [{'id': other.pk, 'status': 'deleted'}]
+        )
+        other.refresh_from_db()
+        self.assertEqual(other.favorites_count, 0)
+        response = self.client.post(
+            '/api/users/subscribe/',
+            {'ids': [self.user.pk, self.author.pk]}, format='json'
+        )
+        self.assertEqual(response.data['results'], [
+            {'id': self.user.pk, 'status': 'self'},
+            {'id': self.author.pk, 'status': 'created'},
+        ])
+        response = self.client.post(
+            '/api/users/subscribe/', {'ids': []}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_bulk_helpers_report_affected_targets(self):
+        other = Recipe.objects.create(
+            name='Другой', text='-', cooking_time=1, author=self.author
+        )
+        Favorite.objects.create(user=self.user, recipe=self.recipe)
+        ids = [self.recipe.pk, other.pk, 999]
+        self.assertEqual(
+            insert_relations(Favorite, 'recipe', self.user.pk, Recipe, ids),
+            {other.pk}
+        )
+        self.assertEqual(
+            insert_relations(Favorite, 'recipe', self.user.pk, Recipe, ids),
+            set()
+        )
+        Favorite.objects.filter(recipe=other).delete()
+        self.assertEqual(
+            delete_relations(Favorite, 'recipe', self.user.pk, ids),
+            {self.recipe.pk}
+        )
+        self.assertEqual(Favorite.objects.count(), 0)
@@ -1,20 +1,29 @@
-from api.mixins import ActionBasedRelationshipMixin
+from api.cache import CatalogResponseCache
+from api.mixins import ActionBasedRelationshipMixin, CachedListMixin
 from api.serializers import (FollowAuthorSerializer, FollowSerializer,
                              IngredientSerializer, RecipeCreateSerializer,
-                             RecipeGetSerializer, RecipeIngredient,
-                             RecipeSampleSerializer, TagSerializer,
-                             UserSerializer)
+                             RecipeGetSerializer, RecipeSampleSerializer,
+                             TagSerializer, UserSerializer)
+from django.conf import settings
+from django.db.models import (BooleanField, Exists, OuterRef, Prefetch, Value,
+                              prefetch_related_objects)
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
 from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
+from recipes.search import ingredient_index
+from recipes.shopping_list import (shopping_list_pdf_response,
+                                   shopping_list_streaming_response)
 from rest_framework.decorators import action
 from rest_framework.permissions import SAFE_METHODS, IsAuthenticated
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 from users.models import Follow, User
 
 from .filters import IngredientFilter, RecipeFilter
 from .pagination import CustomPagination
 from .permissions import IsAdminOrReadOnlyPermission, IsAuthorOrReadOnly
+from .renderers import CSVRenderer, PDFRenderer, PlainTextRenderer
 
 
 class CustomUserViewSet(ActionBasedRelationshipMixin, UserViewSet):
@@ -22,6 +31,15 @@ class CustomUserViewSet(ActionBasedRelationshipMixin, UserViewSet):
     serializer_class = UserSerializer
     pagination_class = CustomPagination
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        user = self.request.user
+        if self.action in ('list', 'retrieve') and user.is_authenticated:
+            queryset = queryset.annotate(is_subscribed=Exists(
+                Follow.objects.filter(user=user, author=OuterRef('pk'))
+            ))
+        return queryset
+
     @action(
         detail=True,
         methods=['post', 'delete'],
@@ -34,6 +52,16 @@ class CustomUserViewSet(ActionBasedRelationshipMixin, UserViewSet):
             user, Follow, serializer, 'Уже подписан', **kwargs
         )
 
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        permission_classes=[IsAuthenticated],
+        url_path='subscribe',
+        url_name='subscribe-bulk'
+    )
+    def subscribe_bulk(self, request):
+        return self.perform_bulk_action(request.user, Follow, 'subscribe')
+
     @action(
         detail=False,
         methods=['get'],
@@ -41,28 +69,47 @@ class CustomUserViewSet(ActionBasedRelationshipMixin, UserViewSet):
         url_path='subscriptions'
     )
     def subscriptions(self, request):
-        queryset = User.objects.filter(following__user=request.user)
+        queryset = User.objects.filter(
+            following__user=request.user
+        ).annotate(
+            is_subscribed=Value(True, output_field=BooleanField()),
+        )
         pages = self.paginate_queryset(queryset)
+        recipes = Recipe.objects.filter(author__in=pages)
+        limit = request.query_params.get('recipes_limit', '')
+        if limit.isdigit():
+            recipes = recipes.limit_per_author(int(limit))
+        prefetch_related_objects(pages, Prefetch('recipes', queryset=recipes))
         serializer = FollowAuthorSerializer(
             pages, many=True, context={'request': request}
         )
         return self.get_paginated_response(serializer.data)
 
 
-class IngredientViewSet(ModelViewSet):
+class IngredientViewSet(CachedListMixin, ModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = (IsAdminOrReadOnlyPermission,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = IngredientFilter
     pagination_class = None
+    list_cache = CatalogResponseCache('ingredients')
+
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get('name')
+        if name and settings.INGREDIENT_SEARCH_IN_MEMORY:
+            return Response(ingredient_index.search(
+                name, settings.INGREDIENT_SEARCH_LIMIT
+            ))
+        return super().list(request, *args, **kwargs)
 
 
-class TagViewSet(ModelViewSet):
+class TagViewSet(CachedListMixin, ModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (IsAdminOrReadOnlyPermission,)
     pagination_class = None
+    list_cache = CatalogResponseCache('tags')
 
 
 class RecipeViewSet(ActionBasedRelationshipMixin, ModelViewSet):
@@ -73,9 +120,9 @@ class RecipeViewSet(ActionBasedRelationshipMixin, ModelViewSet):
     filterset_class = RecipeFilter
 
     def get_queryset(self):
-        recipes = Recipe.objects.prefetch_related(
-            'recipe_ingredients__ingredient', 'tags'
-        ).all()
+        recipes = Recipe.objects.with_related().with_user_flags(
+            self.request.user
+        )
         return recipes
 
     def get_serializer_class(self):
@@ -104,9 +151,30 @@ class RecipeViewSet(ActionBasedRelationshipMixin, ModelViewSet):
             user, ShoppingCart, serializer, 'Такой рецепт уже есть!', **kwargs
         )
 
+    @action(detail=False,
+            methods=['post', 'delete'],
+            permission_classes=[IsAuthenticated],
+            url_path='favorite',
+            url_name='favorite-bulk')
+    def favorite_bulk(self, request):
+        return self.perform_bulk_action(request.user, Favorite, 'favorite')
+
+    @action(detail=False,
+            methods=['post', 'delete'],
+            permission_classes=[IsAuthenticated],
+            url_path='shopping_cart',
+            url_name='shopping-cart-bulk')
+    def shopping_cart_bulk(self, request):
+        return self.perform_bulk_action(
+            request.user, ShoppingCart, 'shopping_cart'
+        )
+
     @action(detail=False, methods=['get'],
-            permission_classes=(IsAuthenticated,))
+            permission_classes=(IsAuthenticated,),
+            renderer_classes=(PDFRenderer, PlainTextRenderer, CSVRenderer,
+                              JSONRenderer))
     def download_shopping_cart(self, request):
-        recipe_ingredient = RecipeIngredient()
-        response = recipe_ingredient.generate_shopping_cart_pdf(request.user)
-        return response
+        format = request.accepted_renderer.format
+        if format == 'pdf':
+            return shopping_list_pdf_response(request.user)
+        return shopping_list_streaming_response(request.user, format)
@@ -74,6 +74,17 @@ DATABASES = {
     }
 }
 
+# Общий кеш нужен, чтобы сброс кешей (токены, справочники) доходил до
+# всех воркеров; без CACHE_LOCATION у каждого процесса свой LocMem.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+        'LOCATION': os.getenv('CACHE_LOCATION'),
+    } if os.getenv('CACHE_LOCATION') else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -117,7 +128,7 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.AllowAny',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
@@ -126,6 +137,15 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 10,
 }
 
+TOKEN_CACHE_TTL = int(os.getenv('TOKEN_CACHE_TTL', 60))
+TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', 10000))
+
+PAGINATION_COUNT_TTL = 30
+PAGINATION_COUNT_ESTIMATE_THRESHOLD = (
+    int(os.getenv('PAGINATION_COUNT_ESTIMATE_THRESHOLD'))
+    if os.getenv('PAGINATION_COUNT_ESTIMATE_THRESHOLD') else None
+)
+
 DJOSER = {
     'LOGIN_FIELD': 'email',
     'SERIALIZERS': {
@@ -142,3 +162,21 @@ DJOSER = {
 }
 
 NAME_OF_F = 'shopping_list.pdf'
+
+SHOPPING_LIST_FONT = os.getenv(
+    'SHOPPING_LIST_FONT', str(BASE_DIR / 'ArialMT.ttf')
+)
+SHOPPING_LIST_WORKERS = int(os.getenv('SHOPPING_LIST_WORKERS', 2))
+SHOPPING_LIST_RENDER_TIMEOUT = 10
+SHOPPING_LIST_ACCEL_REDIRECT = (
+    os.getenv('SHOPPING_LIST_ACCEL_REDIRECT', 'False') == 'True'
+)
+
+IMAGE_UPLOAD_MAX_SIZE = int(
+    os.getenv('IMAGE_UPLOAD_MAX_SIZE', 10 * 1024 * 1024)
+)
+
+INGREDIENT_SEARCH_IN_MEMORY = True
+INGREDIENT_SEARCH_LIMIT = 50
+
+BULK_RELATION_MAX_IDS = 100
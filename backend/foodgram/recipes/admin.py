@@ -6,6 +6,10 @@ from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
 class RecipeIngredientLine(admin.TabularInline):
     model = RecipeIngredient
     extra = 1
+    autocomplete_fields = ('ingredient',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('ingredient')
 
 
 @admin.register(Tag)
@@ -15,31 +19,42 @@ class TagAdmin(admin.ModelAdmin):
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
-    list_display = ('id', 'name', 'author', 'in_favorites',)
-    readonly_fields = ('in_favorites',)
-    list_filter = ('author', 'name', 'tags',)
-
-    def in_favorites(self, obj):
-        return obj.favorite.count()
+    list_display = ('id', 'name', 'author', 'favorites_count',)
+    list_select_related = ('author',)
+    readonly_fields = ('favorites_count',)
+    list_filter = ('tags',)
+    search_fields = ('name',)
+    autocomplete_fields = ('author',)
+    inlines = (RecipeIngredientLine,)
+    show_full_result_count = False
 
 
 @admin.register(Ingredient)
 class IngredientAdmin(admin.ModelAdmin):
     list_display = ('id', 'name', 'measurement_unit',)
-    list_filter = ('name', )
+    search_fields = ('^name',)
+    show_full_result_count = False
 
 
 @admin.register(RecipeIngredient)
 class RecipeIngredientAdmin(admin.ModelAdmin):
     list_display = ('id', 'recipe', 'ingredient', 'amount')
+    list_select_related = ('recipe', 'ingredient')
+    autocomplete_fields = ('recipe', 'ingredient')
+    show_full_result_count = False
 
 
 @admin.register(Favorite)
 class FavoriteAdmin(admin.ModelAdmin):
     list_display = ('id', 'user', 'recipe')
+    list_select_related = ('user', 'recipe')
+    autocomplete_fields = ('user', 'recipe')
+    show_full_result_count = False
 
 
 @admin.register(ShoppingCart)
 class ShoppingCartAdmin(admin.ModelAdmin):
     list_display = ('pk', 'user', 'recipe')
-    list_editable = ('user', 'recipe')
+    list_select_related = ('user', 'recipe')
+    autocomplete_fields = ('user', 'recipe')
+    show_full_result_count = False
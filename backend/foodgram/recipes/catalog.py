@@ -0,0 +1,20 @@
+import time
+
+from django.core.cache import cache
+
+VERSION_KEY = 'catalog-version:{}'
+
+
+def get_version(name):
+    # Начальная версия берётся из часов, а не равна 1: после очистки
+    # кеша процессы не примут свои старые данные за актуальные.
+    return cache.get_or_set(VERSION_KEY.format(name), time.time_ns, None)
+
+
+def bump_version(name):
+    key = VERSION_KEY.format(name)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), None)
+        return cache.incr(key)
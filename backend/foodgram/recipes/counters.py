@@ -0,0 +1,44 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from users.models import Follow, User
+
+from .models import Favorite, Recipe
+
+# Счётчик: модель, поле, откуда считать и по какому полю.
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorite, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'followers_count', Follow, 'author'),
+)
+
+
+def bump(model, field, ids, delta):
+    """Сдвигает счётчик на delta одним UPDATE с F()."""
+    if delta and ids:
+        model.objects.filter(pk__in=ids).update(**{field: F(field) + delta})
+
+
+def actual_count(related, related_field):
+    return Coalesce(Subquery(
+        related.objects.filter(**{related_field: OuterRef('pk')}).order_by()
+        .values(related_field).annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+def reconcile(model, field, related, related_field, batch_size):
+    """Исправляет расхождения пачками по id; отдаёт число исправленных."""
+    last_id = 0
+    while True:
+        ids = list(
+            model.objects.filter(pk__gt=last_id).order_by('pk')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            return
+        last_id = ids[-1]
+        drifted = model.objects.filter(pk__in=ids).annotate(
+            actual=actual_count(related, related_field)
+        ).exclude(**{field: F('actual')}).values_list('pk', flat=True)
+        yield model.objects.filter(pk__in=list(drifted)).update(
+            **{field: actual_count(related, related_field)}
+        )
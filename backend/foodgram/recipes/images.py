@@ -0,0 +1,84 @@
+import hashlib
+import re
+from io import BytesIO
+from pathlib import PurePosixPath
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+ORIGINALS_DIR = 'recipes'
+RENDITIONS_DIR = 'recipes/renditions'
+RENDITIONS = {
+    'full': (1280, 1280),
+    'card': (600, 600),
+    'thumbnail': (240, 240),
+}
+WEBP_QUALITY = 80
+ORIGINAL_NAME = re.compile(
+    rf'^{ORIGINALS_DIR}/(?P<digest>[0-9a-f]{{40}})\.\w+$'
+)
+
+
+def content_digest(file):
+    digest = hashlib.sha1()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def original_name(digest, name):
+    return f'{ORIGINALS_DIR}/{digest}{PurePosixPath(name).suffix.lower()}'
+
+
+def rendition_name(digest, rendition):
+    return f'{RENDITIONS_DIR}/{digest[:2]}/{digest}/{rendition}.webp'
+
+
+def rendition_url(image, rendition):
+    """URL копии картинки; для файлов со старыми именами — оригинал."""
+    match = ORIGINAL_NAME.match(image.name)
+    if match is None:
+        return image.url
+    return image.storage.url(rendition_name(match['digest'], rendition))
+
+
+def save_renditions(file, digest, storage):
+    missing = [
+        rendition for rendition in RENDITIONS
+        if not storage.exists(rendition_name(digest, rendition))
+    ]
+    if not missing:
+        return
+    with Image.open(file) as source:
+        image = ImageOps.exif_transpose(source)
+        has_alpha = (
+            image.mode in ('RGBA', 'LA', 'PA')
+            or 'transparency' in image.info
+        )
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+        for rendition, size in RENDITIONS.items():
+            image.thumbnail(size)
+            if rendition not in missing:
+                continue
+            buffer = BytesIO()
+            image.save(buffer, 'WEBP', quality=WEBP_QUALITY)
+            storage.save(
+                rendition_name(digest, rendition),
+                ContentFile(buffer.getvalue())
+            )
+
+
+def store_recipe_image(recipe):
+    """Кладёт новую картинку рецепта под именем из хеша содержимого.
+
+    Одинаковые загрузки получают одно имя: если такой файл уже есть,
+    рецепт ссылается на него, и повторно ничего не сохраняется.
+    """
+    image = recipe.image
+    digest = content_digest(image)
+    save_renditions(image, digest, image.storage)
+    name = original_name(digest, image.name)
+    if image.storage.exists(name):
+        recipe.image = name
+    else:
+        image.name = name
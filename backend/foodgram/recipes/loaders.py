@@ -0,0 +1,159 @@
+import csv
+import io
+import json
+from pathlib import Path
+
+from django.db import connection, transaction
+
+from .catalog import bump_version
+from .models import Ingredient
+
+READ_SIZE = 64 * 1024
+NAME_LENGTH = Ingredient._meta.get_field('name').max_length
+UNIT_LENGTH = Ingredient._meta.get_field('measurement_unit').max_length
+
+
+def read_csv(file):
+    for row in csv.reader(file):
+        if row:
+            yield row[0], row[1] if len(row) > 1 else ''
+
+
+def read_json(file):
+    """Объекты из JSON-массива по одному, без чтения файла целиком."""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    started = False
+    while True:
+        chunk = file.read(READ_SIZE)
+        buffer = buffer[position:] + chunk
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if position == len(buffer):
+                break
+            if not started:
+                if buffer[position] != '[':
+                    raise ValueError('Ожидался JSON-массив.')
+                started = True
+                position += 1
+                continue
+            if buffer[position] == ']':
+                return
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if not chunk:
+                    raise
+                break
+            yield item['name'], item['measurement_unit']
+        if not chunk:
+            raise ValueError('JSON-массив не закрыт.')
+
+
+READERS = {'.csv': read_csv, '.json': read_json}
+
+
+def read_ingredients(path):
+    reader = READERS.get(Path(path).suffix.lower())
+    if reader is None:
+        raise ValueError(f'Неизвестный формат файла: {path}')
+    with open(path, encoding='utf-8', newline='') as file:
+        yield from reader(file)
+
+
+class Skipped:
+    samples_limit = 10
+
+    def __init__(self):
+        self.count = 0
+        self.samples = []
+
+    def add(self, row):
+        self.count += 1
+        if len(self.samples) < self.samples_limit:
+            self.samples.append(row)
+
+
+def valid_rows(rows, skipped):
+    for name, unit in rows:
+        if not isinstance(name, str) or not isinstance(unit, str):
+            skipped.add((name, unit))
+            continue
+        name, unit = name.strip(), unit.strip()
+        if (not name or not unit or len(name) > NAME_LENGTH
+                or len(unit) > UNIT_LENGTH):
+            skipped.add((name, unit))
+            continue
+        yield name, unit
+
+
+def batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def insert_batches(rows, batch_size, progress):
+    for batch in batches(rows, batch_size):
+        Ingredient.objects.bulk_create(
+            (Ingredient(name=name, measurement_unit=unit)
+             for name, unit in batch),
+            ignore_conflicts=True
+        )
+        progress(len(batch))
+
+
+def copy_batches(rows, batch_size, progress):
+    table = connection.ops.quote_name(Ingredient._meta.db_table)
+    with connection.cursor() as cursor:
+        # Внутри внешней транзакции таблица остаётся от прошлого вызова:
+        # ON COMMIT DROP срабатывает только на настоящем коммите.
+        cursor.execute(
+            'CREATE TEMPORARY TABLE IF NOT EXISTS ingredient_import '
+            '(name text, measurement_unit text) ON COMMIT DROP'
+        )
+        cursor.execute('TRUNCATE ingredient_import')
+        for batch in batches(rows, batch_size):
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(batch)
+            buffer.seek(0)
+            cursor.copy_expert(
+                'COPY ingredient_import FROM STDIN WITH (FORMAT csv)', buffer
+            )
+            progress(len(batch))
+        cursor.execute(
+            f'INSERT INTO {table} (name, measurement_unit) '
+            'SELECT name, measurement_unit FROM ingredient_import '
+            'ON CONFLICT (name, measurement_unit) DO NOTHING'
+        )
+
+
+def load_ingredients(rows, batch_size=5000, progress=None):
+    """Добавляет ингредиенты, которых ещё нет; повторный запуск безопасен.
+
+    Возвращает число новых ингредиентов и пропущенные строки.
+    На PostgreSQL строки идут через COPY во временную таблицу и
+    переносятся одним INSERT ... ON CONFLICT DO NOTHING, на остальных
+    базах — пачками bulk_create(ignore_conflicts=True).
+    """
+    skipped = Skipped()
+    rows = valid_rows(rows, skipped)
+    progress = progress or (lambda count: None)
+    with transaction.atomic():
+        before = Ingredient.objects.count()
+        if connection.vendor == 'postgresql':
+            copy_batches(rows, batch_size, progress)
+        else:
+            insert_batches(rows, batch_size, progress)
+        created = Ingredient.objects.count() - before
+    if created:
+        bump_version('ingredients')
+    return created, skipped
@@ -0,0 +1,56 @@
+import statistics
+import time
+import tracemalloc
+from tempfile import SpooledTemporaryFile
+
+from django.core.management.base import BaseCommand
+from recipes.shopping_list import (SPOOL_SIZE, register_font, render_pdf,
+                                   shopping_list_lines)
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет время и память формирования PDF списка покупок '
+        'для корзин разного размера.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[10, 100, 1000]
+        )
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        register_font()
+        self.stdout.write(
+            f'{"позиций":>8}{"страниц":>9}{"p50 мс":>9}{"max мс":>9}'
+            f'{"пик КБ":>9}{"PDF КБ":>9}'
+        )
+        for size in options['sizes']:
+            items = [
+                {
+                    'ingredient__name': f'Ингредиент номер {number}',
+                    'ingredient__measurement_unit': 'г',
+                    'amount': number * 10,
+                }
+                for number in range(size)
+            ]
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                pages, pdf_size = self.render(items)
+                timings.append((time.perf_counter() - started) * 1000)
+            tracemalloc.start()
+            self.render(items)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self.stdout.write(
+                f'{size:>8}{pages:>9}'
+                f'{statistics.median(timings):>9.1f}{max(timings):>9.1f}'
+                f'{peak / 1024:>9.0f}{pdf_size / 1024:>9.0f}'
+            )
+
+    def render(self, items):
+        with SpooledTemporaryFile(max_size=SPOOL_SIZE) as file:
+            pages = render_pdf(shopping_list_lines(items), file)
+            return pages, file.tell()
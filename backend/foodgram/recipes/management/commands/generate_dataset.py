@@ -0,0 +1,255 @@
+import random
+import time
+from bisect import bisect_left
+from collections import Counter
+from itertools import accumulate
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from recipes.loaders import load_ingredients, read_ingredients
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, Tag)
+from users.models import Follow, User
+
+DEFAULT_INGREDIENTS = settings.BASE_DIR.parent.parent / 'data/ingredients.csv'
+
+DEFAULT_TAGS = (
+    ('Завтрак', '#E26C2D', 'breakfast'),
+    ('Обед', '#49B64E', 'lunch'),
+    ('Ужин', '#8775D2', 'dinner'),
+)
+
+
+class ZipfSampler:
+    """Выборка индексов 0..n-1 с весами 1 / (rank + 1) ** exponent."""
+
+    def __init__(self, rnd, n, exponent):
+        self.rnd = rnd
+        self.cum_weights = list(accumulate(
+            1 / (rank + 1) ** exponent for rank in range(n)
+        ))
+        self.total = self.cum_weights[-1]
+
+    def one(self):
+        return bisect_left(self.cum_weights, self.rnd.random() * self.total)
+
+    def distinct(self, k):
+        k = min(k, len(self.cum_weights))
+        picked = set()
+        while len(picked) < k:
+            picked.add(self.one())
+        return picked
+
+
+class Command(BaseCommand):
+    help = (
+        'Генерирует синтетические данные для нагрузочного тестирования: '
+        'пользователей, рецепты, избранное, корзины и подписки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument(
+            '--favorites', type=int, default=20,
+            help='Среднее число рецептов в избранном у пользователя.'
+        )
+        parser.add_argument(
+            '--carts', type=int, default=3,
+            help='Среднее число рецептов в корзине у пользователя.'
+        )
+        parser.add_argument(
+            '--follows', type=int, default=10,
+            help='Среднее число подписок у пользователя.'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--ingredients', default=str(DEFAULT_INGREDIENTS),
+            help='CSV или JSON c ингредиентами для пустой таблицы.'
+        )
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['batch_size'] < 1:
+            raise CommandError(
+                'Число пользователей и размер пачки должны быть больше нуля.'
+            )
+        self.rnd = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        started = time.monotonic()
+
+        ingredient_ids = self.ensure_ingredients(options['ingredients'])
+        tag_ids = self.ensure_tags()
+        user_ids = self.create_users(options['users'])
+        recipe_ids, author_ids = self.create_recipes(
+            options['recipes'], user_ids, tag_ids, ingredient_ids
+        )
+        self.create_relations(
+            Favorite, 'recipe', user_ids, recipe_ids, options['favorites']
+        )
+        self.create_relations(
+            ShoppingCart, 'recipe', user_ids, recipe_ids, options['carts']
+        )
+        self.create_relations(
+            Follow, 'author', user_ids, author_ids, options['follows']
+        )
+        call_command(
+            'reconcile_counters', batch_size=self.batch_size,
+            stdout=self.stdout
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {time.monotonic() - started:.1f} с.'
+        ))
+
+    def report(self, label, count, started):
+        elapsed = time.monotonic() - started
+        rate = count / elapsed if elapsed else count
+        self.stdout.write(
+            f'{label}: {count} строк за {elapsed:.1f} с ({rate:.0f} строк/с)'
+        )
+
+    def insert(self, model, rows, ignore_conflicts=False):
+        count = 0
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                model.objects.bulk_create(
+                    batch, ignore_conflicts=ignore_conflicts
+                )
+                count += len(batch)
+                batch = []
+        if batch:
+            model.objects.bulk_create(batch, ignore_conflicts=ignore_conflicts)
+            count += len(batch)
+        return count
+
+    def new_ids(self, model, last_id):
+        return list(
+            model.objects.filter(id__gt=last_id).order_by('id')
+            .values_list('id', flat=True)
+        )
+
+    def last_id(self, model):
+        return (
+            model.objects.order_by('-id').values_list('id', flat=True).first()
+            or 0
+        )
+
+    def ensure_ingredients(self, path):
+        if not Ingredient.objects.exists():
+            started = time.monotonic()
+            try:
+                count, _ = load_ingredients(
+                    read_ingredients(path), self.batch_size
+                )
+            except (OSError, ValueError) as error:
+                raise CommandError(
+                    f'Не удалось прочитать ингредиенты: {error}'
+                )
+            self.report('Ингредиенты', count, started)
+        ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+        self.rnd.shuffle(ingredient_ids)
+        return ingredient_ids
+
+    def ensure_tags(self):
+        if not Tag.objects.exists():
+            Tag.objects.bulk_create(
+                Tag(name=name, color=color, slug=slug)
+                for name, color, slug in DEFAULT_TAGS
+            )
+        return list(Tag.objects.order_by('id').values_list('id', flat=True))
+
+    @transaction.atomic
+    def create_users(self, count):
+        started = time.monotonic()
+        last_id = self.last_id(User)
+        password = make_password('foodgram')
+        self.insert(User, (
+            User(
+                username=f'load{last_id + i}',
+                email=f'load{last_id + i}@example.com',
+                first_name='Пользователь',
+                last_name=str(last_id + i),
+                password=password,
+            )
+            for i in range(1, count + 1)
+        ))
+        user_ids = self.new_ids(User, last_id)
+        self.report('Пользователи', len(user_ids), started)
+        return user_ids
+
+    @transaction.atomic
+    def create_recipes(self, count, user_ids, tag_ids, ingredient_ids):
+        started = time.monotonic()
+        authors = ZipfSampler(self.rnd, len(user_ids), 1.1)
+        recipes_by_author = Counter()
+        recipe_ids = []
+        for offset in range(0, count, self.batch_size):
+            size = min(self.batch_size, count - offset)
+            batch = []
+            for i in range(size):
+                author_id = user_ids[authors.one()]
+                recipes_by_author[author_id] += 1
+                batch.append(Recipe(
+                    name=f'Рецепт {offset + i + 1}',
+                    text='Сгенерированный рецепт для нагрузочного теста.',
+                    cooking_time=max(
+                        1, int(self.rnd.lognormvariate(3.4, 0.6))
+                    ),
+                    author_id=author_id,
+                ))
+            last_id = self.last_id(Recipe)
+            Recipe.objects.bulk_create(batch)
+            recipe_ids.extend(self.new_ids(Recipe, last_id))
+        author_ids = [
+            author_id for author_id, _ in recipes_by_author.most_common()
+        ]
+        self.report('Рецепты', len(recipe_ids), started)
+
+        started = time.monotonic()
+        tags = Recipe.tags.through
+        count = self.insert(tags, (
+            tags(recipe_id=recipe_id, tag_id=tag_id)
+            for recipe_id in recipe_ids
+            for tag_id in self.rnd.sample(
+                tag_ids, min(len(tag_ids), self.rnd.choice((1, 1, 2, 3)))
+            )
+        ))
+        self.report('Теги рецептов', count, started)
+
+        started = time.monotonic()
+        ingredients = ZipfSampler(self.rnd, len(ingredient_ids), 0.9)
+        count = self.insert(RecipeIngredient, (
+            RecipeIngredient(
+                recipe_id=recipe_id,
+                ingredient_id=ingredient_ids[index],
+                amount=self.rnd.randint(1, 500),
+            )
+            for recipe_id in recipe_ids
+            for index in ingredients.distinct(self.rnd.randint(3, 15))
+        ))
+        self.report('Ингредиенты рецептов', count, started)
+        return recipe_ids, author_ids
+
+    @transaction.atomic
+    def create_relations(self, model, field, user_ids, target_ids, mean):
+        started = time.monotonic()
+        if not target_ids or mean <= 0:
+            return
+        targets = ZipfSampler(self.rnd, len(target_ids), 1.0)
+
+        def rows():
+            for user_id in user_ids:
+                size = int(self.rnd.expovariate(1 / mean))
+                for index in targets.distinct(size):
+                    target_id = target_ids[index]
+                    if field == 'author' and target_id == user_id:
+                        continue
+                    yield model(user_id=user_id, **{f'{field}_id': target_id})
+
+        count = self.insert(model, rows(), ignore_conflicts=True)
+        self.report(model._meta.verbose_name_plural, count, started)
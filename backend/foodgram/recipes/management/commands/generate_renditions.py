@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from PIL import UnidentifiedImageError
+from recipes.images import (ORIGINAL_NAME, content_digest, original_name,
+                            save_renditions)
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = (
+        'Готовит WebP-копии для уже загруженных картинок рецептов и '
+        'переносит оригиналы под имена из хеша содержимого.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Проверить и картинки с уже новыми именами.'
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image='').only('id', 'image')
+        done = skipped = 0
+        for recipe in recipes.iterator():
+            image = recipe.image
+            if ORIGINAL_NAME.match(image.name) and not options['all']:
+                continue
+            try:
+                with image.open('rb'):
+                    digest = content_digest(image)
+                    save_renditions(image, digest, image.storage)
+                    name = original_name(digest, image.name)
+                    if not image.storage.exists(name):
+                        image.storage.save(name, image)
+            except (OSError, UnidentifiedImageError) as error:
+                skipped += 1
+                self.stderr.write(f'Рецепт {recipe.id}: {error}')
+                continue
+            if name != image.name:
+                Recipe.objects.filter(pk=recipe.pk).update(image=name)
+            done += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано картинок: {done}, пропущено: {skipped}'
+        ))
@@ -0,0 +1,63 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from recipes.loaders import load_ingredients, read_ingredients
+
+DEFAULT_PATH = settings.BASE_DIR.parent.parent / 'data/ingredients.csv'
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает ингредиенты из CSV (название,единица) или JSON '
+        '([{"name": ..., "measurement_unit": ...}]). Уже существующие '
+        'ингредиенты пропускаются, поэтому команду можно запускать '
+        'при каждом деплое.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', default=[str(DEFAULT_PATH)])
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--progress-every', type=int, default=100000,
+            help='Как часто печатать прогресс, в строках.'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('Размер пачки должен быть больше нуля.')
+        for path in options['paths']:
+            self.load(path, options['batch_size'], options['progress_every'])
+
+    def load(self, path, batch_size, every):
+        started = time.monotonic()
+        processed = 0
+        reported = 0
+
+        def progress(count):
+            nonlocal processed, reported
+            processed += count
+            if every and processed - reported >= every:
+                reported = processed
+                self.report(path, processed, started)
+
+        try:
+            created, skipped = load_ingredients(
+                read_ingredients(path), batch_size, progress
+            )
+        except (OSError, ValueError, KeyError) as error:
+            raise CommandError(f'{path}: {error!r}')
+        for name, unit in skipped.samples:
+            self.stderr.write(f'Пропущена строка: {name!r}, {unit!r}')
+        self.report(path, processed, started)
+        self.stdout.write(self.style.SUCCESS(
+            f'{path}: новых ингредиентов {created}, '
+            f'пропущено строк {skipped.count}'
+        ))
+
+    def report(self, path, count, started):
+        elapsed = time.monotonic() - started
+        rate = count / elapsed if elapsed else count
+        self.stdout.write(
+            f'{path}: {count} строк за {elapsed:.1f} с ({rate:.0f} строк/с)'
+        )
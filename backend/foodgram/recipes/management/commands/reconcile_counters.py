@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from recipes.counters import COUNTERS, reconcile
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает счётчики избранного, рецептов и подписчиков и '
+        'исправляет расхождения. Нужна после массовой загрузки данных '
+        'в обход сигналов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('Размер пачки должен быть больше нуля.')
+        for model, field, related, related_field in COUNTERS:
+            started = time.monotonic()
+            fixed = sum(reconcile(
+                model, field, related, related_field, options['batch_size']
+            ))
+            self.stdout.write(
+                f'{model._meta.label}.{field}: исправлено строк {fixed} '
+                f'за {time.monotonic() - started:.1f} с'
+            )
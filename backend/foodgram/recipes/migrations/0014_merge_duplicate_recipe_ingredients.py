@@ -0,0 +1,27 @@
+from django.db import migrations
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicates(apps, schema_editor):
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    groups = RecipeIngredient.objects.values('recipe', 'ingredient').annotate(
+        keep=Min('id'), total=Count('id'), amount=Sum('amount')
+    ).filter(total__gt=1)
+    for group in list(groups):
+        RecipeIngredient.objects.filter(
+            recipe=group['recipe'], ingredient=group['ingredient']
+        ).exclude(id=group['keep']).delete()
+        RecipeIngredient.objects.filter(id=group['keep']).update(
+            amount=group['amount']
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0013_ingredient_unique'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+    ]
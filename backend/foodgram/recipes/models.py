@@ -1,15 +1,12 @@
-import os
-
 from django.contrib.auth import get_user_model
+from django.core.exceptions import EmptyResultSet
 from django.core.validators import MinValueValidator
 from django.db import models
-from django.db.models import Sum
-from django.http import HttpResponse
-from foodgram.settings import NAME_OF_F
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.pdfgen import canvas
+from django.db.models import (BooleanField, Exists, F, OuterRef, Prefetch,
+                              Value, Window)
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
+from users.models import CounterFieldsMixin, Follow
 
 from .validators import validate_hex_color
 
@@ -35,7 +32,52 @@ class Tag(models.Model):
     )
 
 
-class Recipe(models.Model):
+class RecipeQuerySet(models.QuerySet):
+    def with_related(self):
+        return self.select_related('author').prefetch_related(
+            recipe_ingredients_prefetch(), 'tags'
+        )
+
+    def with_user_flags(self, user):
+        if user.is_anonymous:
+            false = Value(False, output_field=BooleanField())
+            return self.annotate(
+                is_favorited=false,
+                is_in_shopping_cart=false,
+                author_is_subscribed=false,
+            )
+        return self.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )),
+            author_is_subscribed=Exists(Follow.objects.filter(
+                user=user, author=OuterRef('author')
+            )),
+        )
+
+    def limit_per_author(self, limit):
+        if limit <= 0:
+            return self.none()
+        ranked = self.order_by().annotate(position=Window(
+            expression=RowNumber(),
+            partition_by=[F('author_id')],
+            order_by=F('id').desc()
+        )).values('id', 'position')
+        try:
+            sql, params = ranked.query.sql_with_params()
+        except EmptyResultSet:
+            return self.none()
+        return self.filter(id__in=RawSQL(
+            f'SELECT ranked.id FROM ({sql}) ranked '
+            'WHERE ranked.position <= %s',
+            (*params, limit)
+        ))
+
+
+class Recipe(CounterFieldsMixin, models.Model):
     name = models.CharField(
         max_length=200,
         verbose_name='Название'
@@ -69,11 +111,26 @@ class Recipe(models.Model):
         blank=True,
         verbose_name='Ссылка на картинку на сайте'
     )
+    favorites_count = models.IntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В избранном'
+    )
+
+    counter_fields = ('favorites_count',)
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         ordering = ['-id']
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = [
+            models.Index(
+                fields=['author', '-id'],
+                name='recipe_author_id_idx'
+            )
+        ]
 
     def __str__(self):
         return self.name
@@ -87,6 +144,12 @@ class Ingredient(models.Model):
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
         ordering = ['name']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name', 'measurement_unit'],
+                name='unique_ingredient'
+            )
+        ]
 
     def __str__(self):
         return f'{self.name}, {self.measurement_unit}'
@@ -110,6 +173,12 @@ class RecipeIngredient(models.Model):
     class Meta:
         verbose_name = 'Ингредиент в рецепте'
         verbose_name_plural = 'Ингредиенты в рецептах'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'ingredient'],
+                name='unique_recipe_ingredient'
+            )
+        ]
 
     def __str__(self):
         return (
@@ -118,39 +187,12 @@ class RecipeIngredient(models.Model):
             f'{self.amount}'
         )
 
-    def get_shopping_cart_text(self, user):
-        recipe_list = RecipeIngredient.objects.filter(
-            recipe__cart__user=user
-        ).values('ingredient__name', 'ingredient__measurement_unit').annotate(
-            amount=Sum('amount')
-        )
-        text = 'Список покупок для готовки:\n'
-        for i in recipe_list:
-            ingredient = i['ingredient__name']
-            unit = i['ingredient__measurement_unit']
-            amount = i['amount']
-            text += f'{ingredient} - {amount} {unit}\n'
-        return text
-
-    def generate_shopping_cart_pdf(self, user):
-        text = self.get_shopping_cart_text(user)
-        response = HttpResponse(content_type='application/pdf; charset=utf-8')
-        response['Content-Disposition'] = f'attachment; filename={NAME_OF_F}'
-        app_path = os.path.realpath(os.path.dirname(__file__))
-        font_path = os.path.join(
-            app_path, '/usr/share/fonts/truetype/ArialMT.ttf'
-        )
-        MyFontObject = TTFont('Arial', font_path)
-        pdfmetrics.registerFont(MyFontObject)
-        c = canvas.Canvas(response, pagesize=letter)
-        c.setFont("Arial", 24)
-        lines = text.split("\n")
-        y = 700
-        for line in lines:
-            c.drawString(100, y, line)
-            y -= 30
-        c.save()
-        return response
+
+def recipe_ingredients_prefetch():
+    return Prefetch(
+        'recipe_ingredients',
+        queryset=RecipeIngredient.objects.select_related('ingredient')
+    )
 
 
 class Favorite(models.Model):
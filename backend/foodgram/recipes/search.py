@@ -0,0 +1,87 @@
+from bisect import bisect_left, bisect_right
+from threading import Lock
+
+from .catalog import get_version
+from .models import Ingredient, Tag
+
+SEPARATOR = '\n'
+
+
+class IngredientIndex:
+    """Поиск ингредиентов по названию в памяти процесса.
+
+    Ключи — названия в нижнем регистре, отсортированные для бинарного
+    поиска по префиксу; для поиска подстроки они склеены в одну строку.
+    Индекс перестраивается, когда меняется версия каталога ингредиентов.
+    """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.version = None
+        self.state = ((), (), (), '')
+
+    def refresh(self):
+        version = get_version('ingredients')
+        if version == self.version:
+            return
+        with self.lock:
+            if version == self.version:
+                return
+            rows = sorted(
+                Ingredient.objects.values('id', 'name', 'measurement_unit'),
+                key=lambda row: (row['name'].casefold(), row['id'])
+            )
+            keys = [
+                row['name'].casefold().replace(SEPARATOR, ' ')
+                for row in rows
+            ]
+            offsets = []
+            position = 0
+            for key in keys:
+                offsets.append(position)
+                position += len(key) + len(SEPARATOR)
+            self.state = (keys, rows, offsets, SEPARATOR.join(keys))
+            self.version = version
+
+    def search(self, query, limit):
+        self.refresh()
+        keys, rows, offsets, haystack = self.state
+        query = query.casefold().replace(SEPARATOR, ' ')
+        found = []
+        index = bisect_left(keys, query)
+        while (index < len(keys) and len(found) < limit
+               and keys[index].startswith(query)):
+            found.append(index)
+            index += 1
+        position = haystack.find(query)
+        while position != -1 and len(found) < limit:
+            index = bisect_right(offsets, position) - 1
+            if position != offsets[index]:
+                found.append(index)
+            next_key = offsets[index] + len(keys[index]) + len(SEPARATOR)
+            position = haystack.find(query, next_key)
+        return [rows[index] for index in found]
+
+
+ingredient_index = IngredientIndex()
+
+
+class TagSlugs:
+    """Соответствие slug → id тегов в памяти процесса.
+
+    Перечитывается, когда меняется версия каталога тегов.
+    """
+
+    def __init__(self):
+        self.version = None
+        self.ids = {}
+
+    def get(self):
+        version = get_version('tags')
+        if version != self.version:
+            self.ids = dict(Tag.objects.values_list('slug', 'id'))
+            self.version = version
+        return self.ids
+
+
+tag_slugs = TagSlugs()
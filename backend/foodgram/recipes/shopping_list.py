@@ -0,0 +1,229 @@
+import csv
+import hashlib
+import json
+import os
+import time
+from concurrent import futures
+from functools import lru_cache
+from pathlib import Path
+from tempfile import NamedTemporaryFile, SpooledTemporaryFile
+from threading import Lock
+
+from django.conf import settings
+from django.db.models import Sum
+from django.http import (FileResponse, HttpResponse, JsonResponse,
+                         StreamingHttpResponse)
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.utils import simpleSplit
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+from .models import RecipeIngredient
+
+TITLE = 'Список покупок для готовки:'
+FONT_NAME = 'Arial'
+FONT_SIZE = 24
+LINE_HEIGHT = 30
+LEFT = 100
+RIGHT = 50
+TOP = 700
+BOTTOM = 60
+SPOOL_SIZE = 1024 * 1024
+CSV_HEADER = ('Ингредиент', 'Количество', 'Единица измерения')
+FILES_DIR = 'shopping_lists'
+RETRY_AFTER = 2
+STALE_AFTER = 60
+
+executor = futures.ThreadPoolExecutor(
+    max_workers=settings.SHOPPING_LIST_WORKERS,
+    thread_name_prefix='shopping-list'
+)
+pending = {}
+pending_lock = Lock()
+
+
+def get_shopping_list(user):
+    return RecipeIngredient.objects.filter(
+        recipe__cart__user=user
+    ).values(
+        'ingredient__name', 'ingredient__measurement_unit'
+    ).annotate(amount=Sum('amount')).order_by('ingredient__name')
+
+
+def shopping_list_lines(items):
+    yield TITLE
+    for item in items:
+        yield (
+            f'{item["ingredient__name"]} - {item["amount"]} '
+            f'{item["ingredient__measurement_unit"]}'
+        )
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def stream_text(items):
+    for line in shopping_list_lines(items):
+        yield f'{line}\n'
+
+
+def stream_csv(items):
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_HEADER)
+    for item in items:
+        yield writer.writerow((
+            item['ingredient__name'],
+            item['amount'],
+            item['ingredient__measurement_unit'],
+        ))
+
+
+def stream_json(items):
+    separator = '['
+    for item in items:
+        yield separator + json.dumps({
+            'name': item['ingredient__name'],
+            'amount': item['amount'],
+            'measurement_unit': item['ingredient__measurement_unit'],
+        }, ensure_ascii=False)
+        separator = ','
+    yield ']' if separator == ',' else '[]'
+
+
+EXPORTS = {
+    'txt': (stream_text, 'text/plain; charset=utf-8'),
+    'csv': (stream_csv, 'text/csv; charset=utf-8'),
+    'json': (stream_json, 'application/json'),
+}
+
+
+@lru_cache(maxsize=None)
+def register_font():
+    pdfmetrics.registerFont(TTFont(FONT_NAME, settings.SHOPPING_LIST_FONT))
+    return FONT_NAME
+
+
+def render_pdf(lines, file):
+    font = register_font()
+    width, _ = letter
+    pdf = canvas.Canvas(file, pagesize=letter)
+    pdf.setFont(font, FONT_SIZE)
+    y = TOP
+    for line in lines:
+        for part in simpleSplit(
+            line, font, FONT_SIZE, width - LEFT - RIGHT
+        ) or ['']:
+            if y < BOTTOM:
+                pdf.showPage()
+                pdf.setFont(font, FONT_SIZE)
+                y = TOP
+            pdf.drawString(LEFT, y, part)
+            y -= LINE_HEIGHT
+    pages = pdf.getPageNumber()
+    pdf.save()
+    return pages
+
+
+def shopping_list_path(user, lines):
+    digest = hashlib.sha1('\n'.join(lines).encode()).hexdigest()
+    return Path(settings.MEDIA_ROOT, FILES_DIR, str(user.pk), f'{digest}.pdf')
+
+
+def write_pdf(lines, path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    file = NamedTemporaryFile(dir=path.parent, suffix='.tmp', delete=False)
+    try:
+        with file:
+            render_pdf(lines, file)
+        os.replace(file.name, path)
+    except BaseException:
+        Path(file.name).unlink(missing_ok=True)
+        raise
+    # Старые файлы удаляются не сразу: их может читать параллельный
+    # запрос или nginx по X-Accel-Redirect.
+    stale_before = time.time() - STALE_AFTER
+    for old in path.parent.glob('*.pdf'):
+        try:
+            if old != path and old.stat().st_mtime < stale_before:
+                old.unlink(missing_ok=True)
+        except FileNotFoundError:
+            pass
+
+
+def forget(path, future):
+    with pending_lock:
+        if pending.get(path) is future:
+            del pending[path]
+
+
+def render_in_background(lines, path):
+    """Один рендер на файл: параллельные запросы ждут общий future."""
+    with pending_lock:
+        future = pending.get(path)
+        if future is None:
+            future = pending[path] = executor.submit(write_pdf, lines, path)
+    future.add_done_callback(lambda done: forget(path, done))
+    return future
+
+
+def shopping_list_pdf_response(user):
+    """PDF из файлового кеша, ключ — пользователь и хеш содержимого.
+
+    Любое изменение корзины или рецептов в ней меняет строки списка,
+    а значит и имя файла; старые файлы пользователя удаляются при
+    записи нового, если им больше STALE_AFTER секунд. Запрос ждёт
+    рендер и отдаёт файл; если рендер не успел за
+    SHOPPING_LIST_RENDER_TIMEOUT, отвечаем 503 с Retry-After — рендер
+    доработает в фоне, и повторный запрос получит готовый файл.
+    """
+    lines = list(shopping_list_lines(get_shopping_list(user)))
+    path = shopping_list_path(user, lines)
+    if not path.exists():
+        try:
+            render_in_background(lines, path).result(
+                timeout=settings.SHOPPING_LIST_RENDER_TIMEOUT
+            )
+        except futures.TimeoutError:
+            response = JsonResponse(
+                {'detail': 'Список покупок готовится, повторите запрос.'},
+                status=503
+            )
+            response['Retry-After'] = RETRY_AFTER
+            return response
+    if settings.SHOPPING_LIST_ACCEL_REDIRECT:
+        response = HttpResponse(content_type='application/pdf')
+        response['X-Accel-Redirect'] = settings.MEDIA_URL + (
+            path.relative_to(settings.MEDIA_ROOT).as_posix()
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="{settings.NAME_OF_F}"'
+        )
+        return response
+    try:
+        file = path.open('rb')
+    except FileNotFoundError:
+        # Файл успели удалить между проверкой и открытием — рисуем
+        # список заново прямо в ответ.
+        file = SpooledTemporaryFile(SPOOL_SIZE)
+        render_pdf(lines, file)
+        file.seek(0)
+    return FileResponse(
+        file,
+        as_attachment=True,
+        filename=settings.NAME_OF_F,
+        content_type='application/pdf'
+    )
+
+
+def shopping_list_streaming_response(user, format):
+    stream, content_type = EXPORTS[format]
+    response = StreamingHttpResponse(
+        stream(get_shopping_list(user).iterator()),
+        content_type=content_type
+    )
+    filename = Path(settings.NAME_OF_F).with_suffix(f'.{format}').name
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -0,0 +1,52 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from users.models import Follow, User
+
+from .catalog import bump_version
+from .counters import bump
+from .images import store_recipe_image
+from .models import Favorite, Ingredient, Recipe, Tag
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def ingredient_changed(**kwargs):
+    bump_version('ingredients')
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def tag_changed(**kwargs):
+    bump_version('tags')
+
+
+@receiver(pre_save, sender=Recipe)
+def recipe_image_changed(instance, **kwargs):
+    if instance.image and not instance.image._committed:
+        store_recipe_image(instance)
+
+
+def count_change(signal, created=False, raw=False, **kwargs):
+    """+1 на создание, -1 на удаление; фикстуры несут счётчики сами."""
+    if signal is post_delete:
+        return -1
+    return 1 if created and not raw else 0
+
+
+@receiver((post_save, post_delete), sender=Favorite)
+def favorite_changed(instance, **kwargs):
+    bump(
+        Recipe, 'favorites_count', [instance.recipe_id],
+        count_change(**kwargs)
+    )
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def recipe_changed(instance, **kwargs):
+    bump(User, 'recipes_count', [instance.author_id], count_change(**kwargs))
+
+
+@receiver((post_save, post_delete), sender=Follow)
+def follow_changed(instance, **kwargs):
+    bump(
+        User, 'followers_count', [instance.author_id],
+        count_change(**kwargs)
+    )
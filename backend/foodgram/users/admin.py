@@ -12,11 +12,19 @@ class UserAdmin(admin.ModelAdmin):
         'email',
         'first_name',
         'last_name',
+        'recipes_count',
+        'followers_count',
     )
-    list_filter = ('email', 'first_name')
+    readonly_fields = ('recipes_count', 'followers_count')
+    list_filter = ('is_staff', 'is_active')
+    search_fields = ('username', 'email')
+    show_full_result_count = False
 
 
 @admin.register(Follow)
 class FollowAdmin(admin.ModelAdmin):
 
     list_display = ('id', 'user', 'author')
+    list_select_related = ('user', 'author')
+    autocomplete_fields = ('user', 'author')
+    show_full_result_count = False
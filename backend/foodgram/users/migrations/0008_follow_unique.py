@@ -0,0 +1,30 @@
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def delete_duplicates(apps, schema_editor):
+    Follow = apps.get_model('users', 'Follow')
+    groups = Follow.objects.values('user', 'author').annotate(
+        keep=Min('id'), total=Count('id')
+    ).filter(total__gt=1)
+    for group in list(groups):
+        Follow.objects.filter(
+            user=group['user'], author=group['author']
+        ).exclude(id=group['keep']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_remove_follow_unique_subscribe'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(
+                fields=('user', 'author'), name='unique_subscribe'
+            ),
+        ),
+    ]
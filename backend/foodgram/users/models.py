@@ -6,7 +6,36 @@ from .validators import validate_username
 MAX_LENGTH = 254
 
 
-class User(AbstractUser):
+class CounterFieldsMixin:
+    """Не даёт обычному save() перезаписать счётчики.
+
+    Счётчики меняются только UPDATE с F() (recipes.counters.bump), а
+    save() существующей строки пишет все поля, кроме counter_fields:
+    иначе устаревший экземпляр вернул бы в базу старые значения.
+    """
+
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and not kwargs.get('force_insert'):
+            update_fields = kwargs.get('update_fields')
+            if update_fields is None:
+                deferred = self.get_deferred_fields()
+                update_fields = [
+                    field.attname for field in self._meta.concrete_fields
+                    if not field.primary_key
+                    and field.attname not in deferred
+                ]
+            kwargs['update_fields'] = [
+                name for name in update_fields
+                if name not in self.counter_fields
+            ]
+            if not kwargs['update_fields']:
+                return
+        super().save(*args, **kwargs)
+
+
+class User(CounterFieldsMixin, AbstractUser):
     username = models.CharField(
         blank=True,
         max_length=150,
@@ -21,6 +50,18 @@ class User(AbstractUser):
         unique=True,
         help_text='Адрес электронной почты'
     )
+    recipes_count = models.IntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Рецептов'
+    )
+    followers_count = models.IntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Подписчиков'
+    )
+
+    counter_fields = ('recipes_count', 'followers_count')
 
     class Meta:
         ordering = ['id']
@@ -49,6 +90,12 @@ class Follow(models.Model):
         ordering = ['-id']
         verbose_name = 'Подписка на блогеров'
         verbose_name_plural = 'Подписки на блогеров'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'],
+                name='unique_subscribe'
+            )
+        ]
 
     def __str__(self):
         return f'{self.user.username} подписан на {self.author.username}'